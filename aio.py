@@ -0,0 +1,244 @@
+# ----------------------------------------------------------------------------#
+# Async venue and artist pages for the ASGI deployment (see asgi.py).
+# ----------------------------------------------------------------------------#
+import asyncio
+import io
+import weakref
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+from flask import abort, render_template
+from flask.signals import request_started
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from werkzeug.exceptions import HTTPException
+
+from cache import cache
+from conditional import is_fresh, revalidated, validators
+from models import Venue, Artist, Show
+from queries import (
+    detail_dict,
+    partition_shows,
+    venue_version_statement,
+    artist_version_statement,
+)
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+# For each detail page: the Show column pointing at the entity, the
+# counterpart model, its Show column and the prefix of its keys in templates.
+DETAILS = {
+    Venue: (Show.venue_id, Artist, Show.artist_id, "artist"),
+    Artist: (Show.artist_id, Venue, Show.venue_id, "venue"),
+}
+
+
+def async_uri(uri):
+    scheme, _, rest = uri.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # WsgiToAsgi runs every request on one shared thread; run them on the
+    # loop's executor instead, like the threads of a sync worker.
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.run_wsgi_app.__wrapped__, thread_sensitive=False
+    )
+
+
+async def detail(session_factory, model, entity_id):
+    """Loads an entity and its shows with two concurrent queries, each on a
+    connection from the pool, as a detail_dict()."""
+    key, counterpart, counterpart_key, prefix = DETAILS[model]
+
+    async def entity():
+        async with session_factory() as session:
+            result = await session.execute(
+                select(model)
+                .options(selectinload(model.genres))
+                .where(model.id == entity_id)
+            )
+            return result.scalar_one_or_none()
+
+    async def shows():
+        async with session_factory() as session:
+            result = await session.execute(
+                select(
+                    Show.start_time,
+                    counterpart_key,
+                    counterpart.name,
+                    counterpart.image_link,
+                )
+                .join(counterpart, counterpart_key == counterpart.id)
+                .where(key == entity_id)
+            )
+            return result.all()
+
+    found, rows = await asyncio.gather(entity(), shows())
+    if found is None:
+        return None
+    return detail_dict(
+        found,
+        [
+            (
+                row[0],
+                {
+                    f"{prefix}_id": row[1],
+                    f"{prefix}_name": row[2],
+                    f"{prefix}_image_link": row[3],
+                },
+            )
+            for row in rows
+        ],
+    )
+
+
+# The async counterpart of each view: its model, version statement, cache
+# namespace, template and template variable.
+VIEWS = {
+    "main.show_venue": (
+        Venue,
+        venue_version_statement,
+        "venue",
+        "pages/show_venue.html",
+        "venue",
+    ),
+    "main.show_artist": (
+        Artist,
+        artist_version_statement,
+        "artist",
+        "pages/show_artist.html",
+        "artist",
+    ),
+}
+
+
+class AsyncApp:
+    """ASGI application serving the venue and artist pages natively async.
+
+    Their version query (for conditional requests) and their data run on an
+    AsyncEngine (asyncpg, aiosqlite in development) created once per event
+    loop and pooled, so a worker keeps serving other requests while those
+    queries wait on the database. Every other route is handed to the WSGI
+    app on the loop's thread pool.
+
+    The async pages read from SQLALCHEMY_ASYNC_DATABASE_URI, or from the
+    primary when that is not set; replica routing does not apply to them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.engines = weakref.WeakKeyDictionary()
+        self.uri = app.config.get(
+            "SQLALCHEMY_ASYNC_DATABASE_URI",
+            async_uri(app.config["SQLALCHEMY_DATABASE_URI"]),
+        )
+        self.engine_options = {}
+        if not self.uri.startswith("sqlite"):
+            self.engine_options.update(
+                pool_size=app.config["ASYNC_DB_POOL_SIZE"],
+                max_overflow=app.config["ASYNC_DB_MAX_OVERFLOW"],
+            )
+
+    def session_factory(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.engines:
+            engine = create_async_engine(self.uri, **self.engine_options)
+            self.engines[loop] = sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self.engines[loop]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        endpoint, view_args = None, {}
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            adapter = self.app.url_map.bind("", script_name=scope.get("root_path"))
+            try:
+                endpoint, view_args = adapter.match(scope["path"], scope["method"])
+            except HTTPException:
+                pass
+        if endpoint not in VIEWS:
+            await ThreadedWsgiInstance(self.app)(scope, receive, send)
+            return
+        instance = WsgiToAsgiInstance(self.app)
+        instance.scope = scope
+        ctx = self.app.request_context(instance.build_environ(scope, io.BytesIO()))
+        error = None
+        try:
+            ctx.push()
+            try:
+                response = await self.full_dispatch(VIEWS[endpoint], view_args)
+            except Exception as e:
+                error = e
+                response = self.app.handle_exception(e)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": [
+                        (name.lower().encode("latin1"), value.encode("latin1"))
+                        for name, value in response.headers.items()
+                    ],
+                }
+            )
+            body = b"" if scope["method"] == "HEAD" else response.get_data()
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            ctx.auto_pop(error)
+
+    async def full_dispatch(self, view, view_args):
+        """Flask.full_dispatch_request() around an awaited view."""
+        request_started.send(self.app)
+        try:
+            rv = self.app.preprocess_request()
+            if rv is None:
+                rv = await self.dispatch(view, *view_args.values())
+        except Exception as e:
+            rv = self.app.handle_user_exception(e)
+        return self.app.finalize_request(rv)
+
+    async def dispatch(self, view, entity_id):
+        model, version_statement, namespace, template, name = view
+        now = datetime.now()
+        session_factory = self.session_factory()
+        async with session_factory() as session:
+            state = (await session.execute(version_statement(entity_id, now))).first()
+        if state is None:
+            abort(404)
+        etag, last_modified = validators(state)
+        if is_fresh(etag, last_modified):
+            return revalidated(("", 304), etag, last_modified)
+        data = await cache.get_or_set_async(
+            namespace,
+            entity_id,
+            lambda: detail(session_factory, model, entity_id),
+        )
+        if data is None:
+            abort(404)
+        # Rendering reads template fragments from the cache too. to_thread()
+        # copies the context variables, and with them the request context.
+        page = await asyncio.to_thread(
+            render_template, template, **{name: partition_shows(data, now)}
+        )
+        return revalidated(page, etag, last_modified)
+
+    async def dispose(self):
+        """Closes the pooled connections of the running loop's engine."""
+        session_factory = self.engines.pop(asyncio.get_running_loop(), None)
+        if session_factory is not None:
+            await session_factory.kw["bind"].dispose()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
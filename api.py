@@ -0,0 +1,226 @@
+# ----------------------------------------------------------------------------#
+# JSON API.
+# ----------------------------------------------------------------------------#
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy.exc import IntegrityError
+
+from booking import book_many
+from cache import cache
+from deletes import delete_entities
+from geo import nearby
+from models import db, Venue, Artist
+from queries import (
+    venue_areas,
+    venue_detail,
+    artist_detail,
+    partition_shows,
+    shows_page,
+    decode_cursor,
+    parse_window,
+    column_page,
+)
+from routing import read_only
+from search import search
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard library encoder is the fallback.
+    orjson = None
+
+api = Blueprint("api", __name__)
+
+# Columns a client may ask for with ?fields=, per resource.
+FIELDS = {
+    Venue: [column.key for column in Venue.__table__.columns],
+    Artist: [column.key for column in Artist.__table__.columns],
+}
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=lambda value: value.isoformat())
+
+
+def respond(data, status=200):
+    return Response(dumps(data), status=status, mimetype="application/json")
+
+
+def error(status, message):
+    return respond({"error": message}, status)
+
+
+def page_size():
+    return min(
+        request.args.get("limit", current_app.config["API_PER_PAGE"], type=int),
+        current_app.config["API_MAX_PER_PAGE"],
+    )
+
+
+def only(data, fields):
+    return {field: data[field] for field in fields if field in data}
+
+
+def list_resource(model):
+    fields = request.args.get("fields", "id,name").split(",")
+    unknown = set(fields) - set(FIELDS[model])
+    if unknown:
+        return error(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    limit = page_size()
+    if limit < 1:
+        return error(400, "limit must be positive")
+    page, next_cursor = column_page(
+        model, fields, limit, request.args.get("after", type=int)
+    )
+    return respond({"data": page, "next": next_cursor})
+
+
+def detail_resource(namespace, loader, entity_id):
+    data = cache.get_or_set(namespace, entity_id, lambda: loader(entity_id))
+    if data is None:
+        return error(404, f"No such {namespace}")
+    data = partition_shows(data, datetime.now())
+    if request.args.get("fields"):
+        data = only(data, request.args["fields"].split(","))
+    return respond(data)
+
+
+@api.route("/venues")
+@read_only
+def venues():
+    return list_resource(Venue)
+
+
+@api.route("/venues/areas")
+@read_only
+def venue_area_list():
+    genre = request.args.get("genre")
+    areas = cache.get_or_set("venues", genre, lambda: venue_areas(genre))
+    return respond({"data": areas})
+
+
+@api.route("/venues/nearby")
+@read_only
+def venues_nearby():
+    """Venues within ?radius= km of ?lat=&lon=, nearest first."""
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return error(400, "lat and lon must be valid coordinates")
+    config = current_app.config
+    radius = request.args.get("radius", config["NEARBY_DEFAULT_RADIUS_KM"], type=float)
+    if not 0 < radius <= config["NEARBY_MAX_RADIUS_KM"]:
+        return error(
+            400,
+            f"radius must be positive and at most {config['NEARBY_MAX_RADIUS_KM']:g} km",
+        )
+    limit = page_size()
+    if limit < 1:
+        return error(400, "limit must be positive")
+    return respond({"data": nearby(lat, lon, radius, limit)})
+
+
+@api.route("/venues/<int:venue_id>")
+@read_only
+def venue(venue_id):
+    return detail_resource("venue", venue_detail, venue_id)
+
+
+@api.route("/artists")
+@read_only
+def artists():
+    return list_resource(Artist)
+
+
+@api.route("/artists/<int:artist_id>")
+@read_only
+def artist(artist_id):
+    return detail_resource("artist", artist_detail, artist_id)
+
+
+@api.route("/shows")
+@read_only
+def shows():
+    limit = page_size()
+    if limit < 1:
+        return error(400, "limit must be positive")
+    after = None
+    if request.args.get("after"):
+        try:
+            after = decode_cursor(request.args["after"])
+        except ValueError:
+            return error(400, "Malformed cursor")
+    try:
+        window = parse_window(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        return error(400, "from and to must be ISO dates or times, from before to")
+    genre, city = request.args.get("genre"), request.args.get("city")
+    data, next_cursor = cache.get_or_set(
+        "shows",
+        (genre, window, city, after, limit),
+        lambda: shows_page(limit, after, genre, window, city),
+    )
+    if request.args.get("fields"):
+        data = [only(show, request.args["fields"].split(",")) for show in data]
+    return respond({"data": data, "next": next_cursor})
+
+
+@api.route("/shows/batch", methods=["POST"])
+def create_shows():
+    """Books {"shows": [...], "atomic": false}, e.g. a tour, in one go.
+
+    Errors and booked rows are numbered from 1.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("shows"), list):
+        return error(400, 'Expected {"shows": [...], "atomic": false}')
+    try:
+        booked, errors = book_many(payload["shows"], atomic=bool(payload.get("atomic")))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return error(409, "A venue or artist was booked meanwhile.")
+    return respond(
+        {
+            "booked": [index + 1 for index in booked],
+            "errors": [
+                {"row": index + 1, "error": message}
+                for index, message in sorted(errors.items())
+            ],
+        },
+        201 if booked else 422,
+    )
+
+
+@api.route("/<any(venues, artists):kind>/delete", methods=["POST"])
+def delete_resources(kind):
+    """Deletes {"ids": [...]} venues or artists with their shows."""
+    payload = request.get_json(silent=True)
+    ids = payload.get("ids") if isinstance(payload, dict) else None
+    if not isinstance(ids, list) or not all(
+        isinstance(entity_id, int) for entity_id in ids
+    ):
+        return error(400, 'Expected {"ids": [...]} with integer ids')
+    model = Venue if kind == "venues" else Artist
+    try:
+        deleted = delete_entities(model, ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return respond({"deleted": deleted, "missing": sorted(set(ids) - set(deleted))})
+
+
+@api.route("/search/<any(venues, artists):kind>")
+@read_only
+def search_resource(kind):
+    term = request.args.get("q", "")
+    limit = page_size()
+    if limit < 1:
+        return error(400, "limit must be positive")
+    model = Venue if kind == "venues" else Artist
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    return respond(search(model, term, limit, offset))
@@ -1,34 +1,69 @@
 # ----------------------------------------------------------------------------#
 # Imports
 # ----------------------------------------------------------------------------#
+import io
 import logging
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
 from logging import Formatter, FileHandler
 
-import babel
-import dateutil.parser
 from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    current_app,
+    jsonify,
     render_template,
     request,
     flash,
     redirect,
     url_for,
     abort,
+    stream_with_context,
 )
-from flask_migrate import Migrate
-from flask_moment import Moment
-
-from forms import *
-from models import app, db, Venue, Artist, Show
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
+
+from api import api
+from booking import BookingError, book, book_many
+from bulk import file_format, read_rows
+from cache import cache
+from conditional import conditional
+from counters import counters_cli
+from deletes import delete_entities
+from forms import VenueForm, ArtistForm, ShowForm, TourForm, describe_errors
+from ical import feed
+from metrics import Metrics
+from models import db, Venue, Artist, Show, Genre
+from profiler import QueryProfiler
+from queries import (
+    venue_areas,
+    venue_detail,
+    artist_detail,
+    partition_shows,
+    artist_list,
+    shows_page,
+    decode_cursor,
+    parse_window,
+    show_feed,
+    venue_version,
+    artist_version,
+    listing_version,
+)
+from routing import Replicas, read_only
+from search import search
+from templating import init_templates
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
 
-moment = Moment(app)
-app.config.from_object("config")
-migrate = Migrate(app, db)
+main = Blueprint("main", __name__)
+metrics = Metrics()
+replicas = Replicas()
+profiler = QueryProfiler()
 
 
 # ----------------------------------------------------------------------------#
@@ -36,16 +71,37 @@ migrate = Migrate(app, db)
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale="en")
+DATETIME_FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    # Babel resolves the locale and compiles the pattern on every call otherwise.
+    # Imported on first use to keep it off worker startup.
+    from babel import Locale
+    from babel.dates import parse_pattern
+
+    return parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale)
 
 
-app.jinja_env.filters["datetime"] = format_datetime
+@lru_cache(maxsize=4096)
+def format_datetime(value, format="medium", locale="en"):
+    if not isinstance(value, datetime):
+        import dateutil.parser
+
+        value = dateutil.parser.parse(value)
+    pattern, locale = datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
+
+
+def stream_template(template_name, **context):
+    # Sends the page chunk by chunk as Jinja renders it instead of building it first.
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(template.generate(**context)))
 
 
 # ----------------------------------------------------------------------------#
@@ -53,7 +109,7 @@ app.jinja_env.filters["datetime"] = format_datetime
 # ----------------------------------------------------------------------------#
 
 
-@app.route("/")
+@main.route("/")
 def index():
     return render_template("pages/home.html")
 
@@ -62,46 +118,24 @@ def index():
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues")
+@main.route("/venues")
+@read_only
+@conditional(lambda: listing_version(Venue, Show, upcoming_after=datetime.now()))
 def venues():
-    data = []
-    city_state_pair = []
-    for venue in Venue.query.distinct(Venue.city, Venue.state):
-        city_state_pair.append((venue.city, venue.state))
-    for city, state in city_state_pair:
-        data_dict = {"city": city, "state": state, "venues": []}
-        for venue in Venue.query.filter_by(city=city, state=state).all():
-            data_dict["venues"].append(
-                {
-                    "id": venue.id,
-                    "name": venue.name,
-                    "num_upcoming_shows": Venue.query.join(Show)
-                    .filter(Venue.id == venue.id, Show.start_time > datetime.now())
-                    .count(),
-                }
-            )
-        data.append(data_dict)
-    return render_template("pages/venues.html", areas=data)
+    genre = request.args.get("genre")
+    areas = cache.get_or_set("venues", genre, lambda: venue_areas(genre))
+    return render_template("pages/venues.html", areas=areas)
 
 
-@app.route("/venues/search", methods=["POST"])
+@main.route("/venues/search", methods=["POST"])
+@read_only
 def search_venues():
-    response = {"count": None, "data": list()}  # Initializing dictionary
     search_term = request.form["search_term"]
-    for venue in Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all():
-        response["count"] = Venue.query.filter(
-            Venue.name.ilike(f"%{search_term}%")
-        ).count()
-        response["data"].append(
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": Venue.query.join(Show)
-                .filter(Venue.id == venue.id, Show.start_time > datetime.now())
-                .count(),
-            }
-        )
-
+    page = max(request.form.get("page", 1, type=int), 1)
+    per_page = current_app.config["SEARCH_PER_PAGE"]
+    response = search(Venue, search_term, per_page, (page - 1) * per_page)
+    response["page"] = page
+    response["has_next"] = page * per_page < response["count"]
     return render_template(
         "pages/search_venues.html",
         results=response,
@@ -109,72 +143,54 @@ def search_venues():
     )
 
 
-@app.route("/venues/<int:venue_id>")
+@main.route("/venues/<int:venue_id>")
+@read_only
+@conditional(lambda venue_id: venue_version(venue_id, datetime.now()))
 def show_venue(venue_id):
-    data = Venue.query.get(venue_id).__dict__
-    data["genres"] = data["genres"].translate({ord(i): None for i in '{"}'}).split(",")
-    data["website"] = data["website_link"]
-    del data["website_link"]  # Due to naming inconsistencies in the project files.
-    data["past_shows_count"] = (
-        Venue.query.join(Show)
-        .filter(Venue.id == venue_id, Show.start_time < datetime.now())
-        .count()
+    data = cache.get_or_set("venue", venue_id, lambda: venue_detail(venue_id))
+    if data is None:
+        abort(404)
+    return render_template(
+        "pages/show_venue.html", venue=partition_shows(data, datetime.now())
     )
-    data["upcoming_shows_count"] = (
-        Venue.query.join(Show)
-        .filter(Venue.id == venue_id, Show.start_time > datetime.now())
-        .count()
+
+
+@main.route("/venues/<int:venue_id>/shows.ics")
+@read_only
+@conditional(lambda venue_id: venue_version(venue_id, datetime.now()))
+def venue_calendar(venue_id):
+    name = db.session.query(Venue.name).filter(Venue.id == venue_id).scalar()
+    if name is None:
+        abort(404)
+    return calendar(
+        name,
+        show_feed(Show.venue_id, venue_id, calendar_since()),
+        url_for("main.show_venue", venue_id=venue_id, _external=True),
+    )
+
+
+def calendar_since():
+    return datetime.now() - timedelta(days=current_app.config["CALENDAR_PAST_DAYS"])
+
+
+def calendar(name, shows, url):
+    # Streamed, so that the feed is written while its rows are fetched.
+    return Response(
+        stream_with_context(feed(name, shows, url)), mimetype="text/calendar"
     )
-    data["past_shows"] = []
-    data["upcoming_shows"] = []
-    for show in (
-        Show.query.join(Venue)
-        .filter(Venue.id == venue_id, Show.start_time < datetime.now())
-        .all()
-    ):
-        data["past_shows"].append(
-            {
-                "artist_id": show.artist_id,
-                "artist_name": Artist.query.filter(Artist.id == show.artist_id)
-                .first()
-                .name,
-                "artist_image_link": Artist.query.filter(Artist.id == show.artist_id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time), format="full"),
-            }
-        )
-    for show in (
-        Show.query.join(Venue)
-        .filter(Venue.id == venue_id, Show.start_time > datetime.now())
-        .all()
-    ):
-        data["upcoming_shows"].append(
-            {
-                "artist_id": show.artist_id,
-                "artist_name": Artist.query.filter(Artist.id == show.artist_id)
-                .first()
-                .name,
-                "artist_image_link": Artist.query.filter(Artist.id == show.artist_id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time), format="full"),
-            }
-        )
-    return render_template("pages/show_venue.html", venue=data)
 
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/create", methods=["GET"])
+@main.route("/venues/create", methods=["GET"])
 def create_venue_form():
     form = VenueForm()
     return render_template("forms/new_venue.html", form=form)
 
 
-@app.route("/venues/create", methods=["POST"])
+@main.route("/venues/create", methods=["POST"])
 def create_venue_submission():
     error = False
     try:
@@ -183,6 +199,7 @@ def create_venue_submission():
         data_dict = {
             key: request_body[key] for key in request_body if key != "csrf_token"
         }
+        data_dict["genres"] = Genre.from_names(data_dict["genres"])
         data = Venue(**data_dict)
         db.session.add(data)
         db.session.commit()
@@ -200,12 +217,15 @@ def create_venue_submission():
     return render_template("pages/home.html")
 
 
-@app.route("/venues/<venue_id>", methods=["DELETE"])
+@main.route("/venues/<int:venue_id>", methods=["DELETE"])
 def delete_venue(venue_id):
+    return delete_entity(Venue, venue_id)
+
+
+def delete_entity(model, entity_id):
     error = False
     try:
-        venue = Venue.query.get(venue_id)
-        db.session.delete(venue)
+        deleted = delete_entities(model, [entity_id])
         db.session.commit()
     except:
         db.session.rollback()
@@ -214,37 +234,31 @@ def delete_venue(venue_id):
         db.session.close()
     if error:
         abort(500)
-    return None
+    if not deleted:
+        abort(404)
+    return jsonify({"success": True})
 
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route("/artists")
+@main.route("/artists")
+@read_only
+@conditional(lambda: listing_version(Artist))
 def artists():
-    data = []
-    for artist in Artist.query.all():
-        data.append({"id": artist.id, "name": artist.name})
+    genre = request.args.get("genre")
+    data = cache.get_or_set("artists", genre, lambda: artist_list(genre))
     return render_template("pages/artists.html", artists=data)
 
 
-@app.route("/artists/search", methods=["POST"])
+@main.route("/artists/search", methods=["POST"])
+@read_only
 def search_artists():
-    response = {"count": None, "data": list()}
     search_term = request.form["search_term"]
-    for artist in Artist.query.filter(Artist.name.ilike(f"%{search_term}%")).all():
-        response["count"] = Artist.query.filter(
-            Artist.name.ilike(f"%{search_term}%")
-        ).count()
-        response["data"].append(
-            {
-                "id": artist.id,
-                "name": artist.name,
-                "num_upcoming_shows": Artist.query.join(Show)
-                .filter(Artist.id == artist.id, Show.start_time > datetime.now())
-                .count(),
-            }
-        )
-
+    page = max(request.form.get("page", 1, type=int), 1)
+    per_page = current_app.config["SEARCH_PER_PAGE"]
+    response = search(Artist, search_term, per_page, (page - 1) * per_page)
+    response["page"] = page
+    response["has_next"] = page * per_page < response["count"]
     return render_template(
         "pages/search_artists.html",
         results=response,
@@ -252,81 +266,57 @@ def search_artists():
     )
 
 
-@app.route("/artists/<int:artist_id>")
+@main.route("/artists/<int:artist_id>")
+@read_only
+@conditional(lambda artist_id: artist_version(artist_id, datetime.now()))
 def show_artist(artist_id):
-    data = Artist.query.get(artist_id).__dict__
-    data["genres"] = data["genres"].translate({ord(i): None for i in '{"}'}).split(",")
-    data["website"] = data["website_link"]
-    del data["website_link"]  # Due to naming inconsistencies in the project files.
-    data["past_shows_count"] = (
-        Artist.query.join(Show)
-        .filter(Artist.id == artist_id, Show.start_time < datetime.now())
-        .count()
+    data = cache.get_or_set("artist", artist_id, lambda: artist_detail(artist_id))
+    if data is None:
+        abort(404)
+    return render_template(
+        "pages/show_artist.html", artist=partition_shows(data, datetime.now())
     )
-    data["upcoming_shows_count"] = (
-        Artist.query.join(Show)
-        .filter(Artist.id == artist_id, Show.start_time > datetime.now())
-        .count()
+
+
+@main.route("/artists/<int:artist_id>/shows.ics")
+@read_only
+@conditional(lambda artist_id: artist_version(artist_id, datetime.now()))
+def artist_calendar(artist_id):
+    name = db.session.query(Artist.name).filter(Artist.id == artist_id).scalar()
+    if name is None:
+        abort(404)
+    return calendar(
+        name,
+        show_feed(Show.artist_id, artist_id, calendar_since()),
+        url_for("main.show_artist", artist_id=artist_id, _external=True),
     )
-    data["past_shows"] = []
-    data["upcoming_shows"] = []
-    for show in (
-        Show.query.join(Artist)
-        .filter(Artist.id == artist_id, Show.start_time < datetime.now())
-        .all()
-    ):
-        data["past_shows"].append(
-            {
-                "venue_id": show.venue_id,
-                "venue_name": Venue.query.filter(Venue.id == show.venue_id)
-                .first()
-                .name,
-                "venue_image_link": Venue.query.filter(Venue.id == show.venue_id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time), format="full"),
-            }
-        )
-    for show in (
-        Show.query.join(Artist)
-        .filter(Artist.id == artist_id, Show.start_time > datetime.now())
-        .all()
-    ):
-        data["upcoming_shows"].append(
-            {
-                "venue_id": show.venue_id,
-                "venue_name": Venue.query.filter(Venue.id == show.venue_id)
-                .first()
-                .name,
-                "venue_image_link": Venue.query.filter(Venue.id == show.venue_id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time), format="full"),
-            }
-        )
-    return render_template("pages/show_artist.html", artist=data)
 
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
+@main.route("/artists/<int:artist_id>", methods=["DELETE"])
+def delete_artist(artist_id):
+    return delete_entity(Artist, artist_id)
+
+
+@main.route("/artists/<int:artist_id>/edit", methods=["GET"])
 def edit_artist(artist_id):
-    artist = Artist.query.get(artist_id).__dict__
-    artist["genres"] = (
-        artist["genres"].translate({ord(i): None for i in '{"}'}).split(",")
-    )
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        abort(404)
+    artist = dict(artist.__dict__, genres=[genre.name for genre in artist.genres])
     form = ArtistForm(**artist)
     return render_template("forms/edit_artist.html", form=form, artist=artist)
 
 
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
+@main.route("/artists/<int:artist_id>/edit", methods=["POST"])
 def edit_artist_submission(artist_id):
     error = False
     try:
         form_body = ArtistForm(request.form).data
         artist = Artist.query.get(artist_id)
         artist.name = form_body["name"]
-        artist.genres = form_body["genres"]
+        artist.genres = Genre.from_names(form_body["genres"])
         artist.city = form_body["city"]
         artist.state = form_body["state"]
         artist.phone = form_body["phone"]
@@ -343,27 +333,27 @@ def edit_artist_submission(artist_id):
         db.session.close()
     if error:
         abort(500)
-    return redirect(url_for("show_artist", artist_id=artist_id))
+    return redirect(url_for("main.show_artist", artist_id=artist_id))
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
+@main.route("/venues/<int:venue_id>/edit", methods=["GET"])
 def edit_venue(venue_id):
-    venue = Venue.query.get(venue_id).__dict__
-    venue["genres"] = (
-        venue["genres"].translate({ord(i): None for i in '{"}'}).split(",")
-    )
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        abort(404)
+    venue = dict(venue.__dict__, genres=[genre.name for genre in venue.genres])
     form = VenueForm(**venue)
     return render_template("forms/edit_venue.html", form=form, venue=venue)
 
 
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
+@main.route("/venues/<int:venue_id>/edit", methods=["POST"])
 def edit_venue_submission(venue_id):
     error = False
     try:
         form_body = VenueForm(request.form).data
         venue = Venue.query.get(venue_id)
         venue.name = form_body["name"]
-        venue.genres = form_body["genres"]
+        venue.genres = Genre.from_names(form_body["genres"])
         venue.city = form_body["city"]
         venue.state = form_body["state"]
         venue.address = form_body["address"]
@@ -381,20 +371,20 @@ def edit_venue_submission(venue_id):
         db.session.close()
     if error:
         abort(500)
-    return redirect(url_for("show_venue", venue_id=venue_id))
+    return redirect(url_for("main.show_venue", venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
 
-@app.route("/artists/create", methods=["GET"])
+@main.route("/artists/create", methods=["GET"])
 def create_artist_form():
     form = ArtistForm()
     return render_template("forms/new_artist.html", form=form)
 
 
-@app.route("/artists/create", methods=["POST"])
+@main.route("/artists/create", methods=["POST"])
 def create_artist_submission():
     error = False
     try:
@@ -403,6 +393,7 @@ def create_artist_submission():
         data_dict = {
             key: request_body[key] for key in request_body if key != "csrf_token"
         }
+        data_dict["genres"] = Genre.from_names(data_dict["genres"])
         data = Artist(**data_dict)
         db.session.add(data)
         db.session.commit()
@@ -426,85 +417,211 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 
-@app.route("/shows")
+@main.route("/shows")
+@read_only
+@conditional(lambda: listing_version(Show, Venue, Artist))
 def shows():
-    data = []
-    for show in Show.query.all():
-        data.append(
-            {
-                "venue_id": show.venue_id,
-                "venue_name": Venue.query.join(Show)
-                .filter(Show.id == show.id)
-                .filter(Venue.id == show.venue_id)
-                .first()
-                .name,
-                "artist_id": show.artist_id,
-                "artist_name": Artist.query.join(Show)
-                .filter(Show.id == show.id)
-                .filter(Artist.id == show.artist_id)
-                .first()
-                .name,
-                "artist_image_link": Artist.query.join(Show)
-                .filter(Show.id == show.id)
-                .filter(Artist.id == show.artist_id)
-                .first()
-                .image_link,
-                "start_time": format_datetime(str(show.start_time), format="full"),
-            }
-        )
-    return render_template("pages/shows.html", shows=data)
-
-
-@app.route("/shows/create")
+    per_page = min(
+        request.args.get("per_page", current_app.config["SHOWS_PER_PAGE"], type=int),
+        current_app.config["SHOWS_MAX_PER_PAGE"],
+    )
+    if per_page < 1:
+        abort(400)
+    after = None
+    if request.args.get("after"):
+        try:
+            after = decode_cursor(request.args["after"])
+        except ValueError:
+            abort(400)
+    filters = {
+        key: request.args[key]
+        for key in ("genre", "from", "to", "city")
+        if request.args.get(key)
+    }
+    try:
+        window = parse_window(filters.get("from"), filters.get("to"))
+    except ValueError:
+        abort(400)
+    genre, city = filters.get("genre"), filters.get("city")
+    data, next_cursor = cache.get_or_set(
+        "shows",
+        (genre, window, city, after, per_page),
+        lambda: shows_page(per_page, after, genre, window, city),
+    )
+    context = {
+        "shows": data,
+        "next_cursor": next_cursor,
+        "per_page": per_page,
+        "filters": filters,
+    }
+    stream = request.args.get("stream", type=lambda value: value in ("1", "true"))
+    if current_app.config["STREAM_SHOWS"] if stream is None else stream:
+        return stream_template("pages/shows.html", **context)
+    return render_template("pages/shows.html", **context)
+
+
+@main.route("/shows/create")
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template("forms/new_show.html", form=form)
 
 
-@app.route("/shows/create", methods=["POST"])
+@main.route("/shows/create", methods=["POST"])
 def create_show_submission():
-    error = False
+    error = None
     try:
-        request_body = ShowForm(request.form).data
-        # Removing csrf_token while preserving the original request body to be able to use tuple-unpacking
-        data_dict = {
-            key: request_body[key] for key in request_body if key != "csrf_token"
-        }
-        data = Show(**data_dict)
-        db.session.add(data)
+        form = ShowForm(request.form)
+        if not form.validate():
+            raise BookingError(describe_errors(form.errors))
+        book(form.data)
         db.session.commit()
+    except BookingError as booking_error:
+        db.session.rollback()
+        error = str(booking_error)
+    except IntegrityError:
+        # A PostgreSQL exclusion constraint caught an overlap committed meanwhile.
+        db.session.rollback()
+        error = "The venue or artist was booked at that time meanwhile."
     except:
         db.session.rollback()
-        error = True
+        error = "An error occurred."
     finally:
         db.session.close()
     if error:
-        flash("An error occurred. Show could not be listed.")
+        flash(f"{error} Show could not be listed.")
     else:
         flash("Show was successfully listed!")
     return render_template("pages/home.html")
 
 
-@app.errorhandler(404)
+@main.route("/shows/batch")
+def create_tour_form():
+    form = TourForm()
+    return render_template("forms/new_tour.html", form=form)
+
+
+@main.route("/shows/batch", methods=["POST"])
+def create_tour_submission():
+    form = TourForm()
+    if not form.validate():
+        flash(describe_errors(form.errors))
+        return render_template("forms/new_tour.html", form=form)
+    upload = form.schedule.data
+    try:
+        rows = list(
+            read_rows(
+                io.TextIOWrapper(upload.stream, encoding="utf-8"),
+                file_format(upload.filename, None),
+            )
+        )
+        booked, errors = book_many(rows, atomic=form.atomic.data)
+        db.session.commit()
+    except (UnicodeDecodeError, ValueError):
+        booked, errors = [], {None: "The schedule is not valid CSV or JSON Lines."}
+    except IntegrityError:
+        db.session.rollback()
+        booked, errors = [], {None: "A venue or artist was booked meanwhile."}
+    finally:
+        db.session.close()
+    for index, message in sorted(errors.items(), key=lambda item: item[0] or 0):
+        flash(message if index is None else f"Row {index + 1}: {message}")
+    flash(f"{len(booked)} shows listed, {len(errors)} rows rejected.")
+    return render_template("pages/home.html")
+
+
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
 
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter("%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
+@main.route("/debug/pool")
+def pool_stats():
+    # Per-worker view of the connection pool, used to size pools across workers.
+    if not current_app.config["POOL_STATS"]:
+        abort(404)
+    pool = db.engine.pool
+    stats = {"pid": os.getpid(), "pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return jsonify(stats)
+
+
+@main.route("/debug/queries")
+def query_stats():
+    # Query counts, DB time and most repeated statements of recent requests.
+    if "profiler" not in current_app.extensions:
+        abort(404)
+    return jsonify(list(current_app.extensions["profiler"].recent))
+
+
+# ----------------------------------------------------------------------------#
+# App Factory.
+# ----------------------------------------------------------------------------#
+
+
+def register_commands(app):
+    # Alembic and the bulk/benchmark tooling are only needed by the flask
+    # command, so web workers never import them.
+    from flask_migrate import Migrate
+
+    from bench import seed_command, bench_command
+    from bulk import import_command, export_command
+    from geo import geocode_command
+    from templating import compile_templates_command
+
+    Migrate(app, db)
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(geocode_command)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(bench_command)
+    app.cli.add_command(compile_templates_command)
+
+
+def create_app(config_object="config"):
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    if not app.config.get("SECRET_KEY"):
+        raise RuntimeError("Set the SECRET_KEY environment variable.")
+    metrics.init_app(app)
+    db.init_app(app)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        register_commands(app)
+    replicas.init_app(app)
+    cache.init_app(app)
+    profiler.init_app(app)
+    init_templates(app)
+    app.jinja_env.filters["datetime"] = format_datetime
+    app.register_blueprint(main)
+    app.register_blueprint(api, url_prefix="/api/v1")
+
+    if not app.debug:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+            )
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+    return app
+
+
+app = create_app()
 
 # ----------------------------------------------------------------------------#
 # Launch.
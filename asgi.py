@@ -0,0 +1,14 @@
+# ----------------------------------------------------------------------------#
+# ASGI entry point.
+#
+# Serves the same app under an ASGI server, with the read-heavy venue and
+# artist pages served by async views on a pooled asyncpg engine (aio.py):
+#
+#   uvicorn asgi:application --workers 4
+#
+# `flask bench --concurrency 16` compares it with the sync app.
+# ----------------------------------------------------------------------------#
+from aio import AsyncApp
+from app import app
+
+application = AsyncApp(app)
@@ -0,0 +1,674 @@
+# ----------------------------------------------------------------------------#
+# Synthetic data and route benchmarks.
+# ----------------------------------------------------------------------------#
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, select
+
+from aio import AsyncApp
+from booking import Timeline
+from cache import cache
+from counters import refresh
+from forms import STATE_CHOICES, GENRE_CHOICES, SHOW_DEFAULT_MINUTES
+from models import (
+    db,
+    Venue,
+    Artist,
+    Show,
+    Genre,
+    venue_genres,
+    artist_genres,
+    is_upcoming,
+)
+
+STATES = [value for value, _ in STATE_CHOICES]
+GENRES = [value for value, _ in GENRE_CHOICES]
+# p95 latency may grow by --tolerance plus this many milliseconds before the
+# gate fails, so that fast routes do not fail on timer noise.
+LATENCY_SLACK_MS = 5.0
+
+
+def insert_rows(model, rows, batch_size):
+    """Inserts rows with executemany and returns their new ids in order."""
+    start = db.session.execute(select(func.max(model.id))).scalar() or 0
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(model.__table__.insert(), rows[offset : offset + batch_size])
+    return (
+        db.session.execute(select(model.id).where(model.id > start).order_by(model.id))
+        .scalars()
+        .all()
+    )
+
+
+def entity_rows(rng, kind, count, cities):
+    rows = []
+    for index in range(count):
+        city, state = rng.choice(cities)
+        row = {
+            "name": f"{kind.title()} {index}",
+            "city": city,
+            "state": state,
+            "phone": f"{rng.randrange(200, 999)}-555-{rng.randrange(10000):04d}",
+            "image_link": f"https://picsum.photos/seed/{kind}{index}/300/300",
+            "facebook_link": f"https://www.facebook.com/{kind}{index}",
+            "website_link": f"https://{kind}{index}.example.com",
+            "seeking_description": f"{kind.title()} {index} is looking.",
+        }
+        if kind == "venue":
+            row.update(
+                address=f"{rng.randrange(1, 2000)} Main St",
+                seeking_talent=rng.random() < 0.3,
+            )
+        else:
+            row["seeking_venue"] = rng.random() < 0.3
+        rows.append(row)
+    return rows
+
+
+def genre_rows(rng, ids, key, genres, batch_size, association):
+    rows = [
+        {key: entity_id, "genre_id": genre.id}
+        for entity_id in ids
+        for genre in rng.sample(genres, rng.randint(1, 3))
+    ]
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(association.insert(), rows[offset : offset + batch_size])
+
+
+def show_rows(rng, count, venue_ids, artist_ids, days):
+    """Random shows, redrawing any slot that would double-book a venue or
+    an artist."""
+    now = datetime.now().replace(second=0, microsecond=0)
+    timelines = defaultdict(Timeline)
+    rows = []
+    while len(rows) < count:
+        venue_id, artist_id = rng.choice(venue_ids), rng.choice(artist_ids)
+        start_time = now + timedelta(minutes=30 * rng.randint(-48 * days, 48 * days))
+        end_time = start_time + timedelta(minutes=SHOW_DEFAULT_MINUTES)
+        venue, artist = timelines["venue", venue_id], timelines["artist", artist_id]
+        if venue.overlapping(start_time, end_time) or artist.overlapping(
+            start_time, end_time
+        ):
+            continue
+        venue.add(start_time, end_time, None)
+        artist.add(start_time, end_time, None)
+        rows.append(
+            {
+                "venue_id": venue_id,
+                "artist_id": artist_id,
+                "start_time": start_time,
+                "end_time": end_time,
+            }
+        )
+    return rows
+
+
+@click.command("seed")
+@click.option("--venues", default=200, show_default=True)
+@click.option("--artists", default=500, show_default=True)
+@click.option("--shows", default=5000, show_default=True)
+@click.option("--cities", default=25, show_default=True)
+@click.option(
+    "--days", default=365, show_default=True, help="Shows start up to this far away."
+)
+@click.option("--seed", default=0, show_default=True, help="Random seed.")
+@click.option("--batch-size", default=5000, show_default=True)
+@with_appcontext
+def seed_command(venues, artists, shows, cities, days, seed, batch_size):
+    """Adds reproducible synthetic venues, artists and shows.
+
+    The same options and seed always generate the same rows, so benchmark
+    baselines stay comparable. Run it on an empty database.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    places = [(f"City {index}", rng.choice(STATES)) for index in range(cities)]
+    # Drawn separately so that the other rows do not depend on them.
+    coordinates = random.Random(f"{seed}-geo")
+    located = {
+        place: (coordinates.uniform(25, 49), coordinates.uniform(-124, -67))
+        for place in places
+    }
+    genres = Genre.from_names(GENRES)
+    db.session.flush()
+    venue_rows = entity_rows(rng, "venue", venues, places)
+    for row in venue_rows:
+        row["latitude"], row["longitude"] = located[row["city"], row["state"]]
+    venue_ids = insert_rows(Venue, venue_rows, batch_size)
+    artist_ids = insert_rows(
+        Artist, entity_rows(rng, "artist", artists, places), batch_size
+    )
+    genre_rows(rng, venue_ids, "venue_id", genres, batch_size, venue_genres)
+    genre_rows(rng, artist_ids, "artist_id", genres, batch_size, artist_genres)
+    insert_rows(Show, show_rows(rng, shows, venue_ids, artist_ids, days), batch_size)
+    refresh(Venue)
+    refresh(Artist)
+    db.session.commit()
+    for namespace in ("venues", "venue", "artists", "artist", "shows"):
+        cache.invalidate(namespace)
+    click.echo(
+        f"Seeded {venues} venues, {artists} artists and {shows} shows in "
+        f"{time.perf_counter() - started:.1f}s."
+    )
+
+
+def throwaway(model):
+    """Adds a row for a delete case to remove, returning its id."""
+    values = {"name": f"Bench {model.__name__}", "city": "Bench", "state": "CA"}
+    if model is Venue:
+        values["address"] = "1 Bench St"
+    entity = model(**values)
+    db.session.add(entity)
+    db.session.commit()
+    return entity.id
+
+
+def cases():
+    """(name, method, path, options) for every benchmarked route.
+
+    options are the keyword arguments of the test client request, e.g. data
+    or json. The path and the options may be functions returning them,
+    called before each request outside of the timing.
+    """
+    venue = db.session.execute(select(Venue).order_by(Venue.id)).scalars().first()
+    artist = db.session.execute(select(Artist).order_by(Artist.id)).scalars().first()
+    if venue is None or artist is None:
+        raise click.ClickException("No data to benchmark, run flask seed first.")
+    venue_form = {
+        "name": "Bench Venue",
+        "city": venue.city,
+        "state": venue.state,
+        "address": "1 Bench St",
+        "genres": ["Jazz", "Blues"],
+        "facebook_link": "https://www.facebook.com/bench",
+    }
+    artist_form = dict(venue_form, name="Bench Artist")
+    del artist_form["address"]
+    # Edits resubmit the stored name and place so that the data stays put.
+    venue_edit = dict(venue_form, name=venue.name, address=venue.address)
+    artist_edit = dict(artist_form, name=artist.name, city=artist.city)
+    artist_edit["state"] = artist.state
+    # A fresh slot per booking after every stored show, so that each
+    # submission books instead of hitting a conflict.
+    latest = db.session.execute(select(func.max(Show.start_time))).scalar()
+    venue_id, artist_id = venue.id, artist.id
+    nearby = (
+        f"/api/v1/venues/nearby?lat={venue.latitude or 40}"
+        f"&lon={venue.longitude or -100}&radius=500"
+    )
+    slots = itertools.count(1)
+
+    def slot():
+        start_time = (latest or datetime.now()) + timedelta(days=next(slots))
+        return start_time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def show_form():
+        return {
+            "data": {"venue_id": venue_id, "artist_id": artist_id, "start_time": slot()}
+        }
+
+    def tour_rows():
+        return [
+            {"venue_id": venue_id, "artist_id": artist_id, "start_time": slot()}
+            for _ in range(3)
+        ]
+
+    def tour_upload():
+        schedule = "venue_id,artist_id,start_time\n" + "".join(
+            f"{row['venue_id']},{row['artist_id']},{row['start_time']}\n"
+            for row in tour_rows()
+        )
+        return {
+            "data": {"schedule": (io.BytesIO(schedule.encode()), "tour.csv")},
+            "content_type": "multipart/form-data",
+        }
+
+    return [
+        ("index", "GET", "/", None),
+        ("venues", "GET", "/venues", None),
+        ("show_venue", "GET", f"/venues/{venue.id}", None),
+        ("venue_calendar", "GET", f"/venues/{venue.id}/shows.ics", None),
+        (
+            "search_venues",
+            "POST",
+            "/venues/search",
+            {"data": {"search_term": "venue 1"}},
+        ),
+        ("create_venue_form", "GET", "/venues/create", None),
+        ("create_venue", "POST", "/venues/create", {"data": venue_form}),
+        ("edit_venue_form", "GET", f"/venues/{venue.id}/edit", None),
+        ("edit_venue", "POST", f"/venues/{venue.id}/edit", {"data": venue_edit}),
+        ("delete_venue", "DELETE", lambda: f"/venues/{throwaway(Venue)}", None),
+        ("artists", "GET", "/artists", None),
+        ("show_artist", "GET", f"/artists/{artist.id}", None),
+        ("artist_calendar", "GET", f"/artists/{artist.id}/shows.ics", None),
+        (
+            "search_artists",
+            "POST",
+            "/artists/search",
+            {"data": {"search_term": "artist 1"}},
+        ),
+        ("create_artist_form", "GET", "/artists/create", None),
+        ("create_artist", "POST", "/artists/create", {"data": artist_form}),
+        ("edit_artist_form", "GET", f"/artists/{artist.id}/edit", None),
+        ("edit_artist", "POST", f"/artists/{artist.id}/edit", {"data": artist_edit}),
+        ("delete_artist", "DELETE", lambda: f"/artists/{throwaway(Artist)}", None),
+        ("shows", "GET", "/shows", None),
+        ("shows_city", "GET", f"/shows?city={quote(venue.city)}", None),
+        ("create_show_form", "GET", "/shows/create", None),
+        ("create_show", "POST", "/shows/create", show_form),
+        ("create_tour_form", "GET", "/shows/batch", None),
+        ("create_tour", "POST", "/shows/batch", tour_upload),
+        ("api_venues", "GET", "/api/v1/venues", None),
+        ("api_venue_areas", "GET", "/api/v1/venues/areas", None),
+        ("api_venue", "GET", f"/api/v1/venues/{venue.id}", None),
+        ("api_venues_nearby", "GET", nearby, None),
+        ("api_artists", "GET", "/api/v1/artists", None),
+        ("api_artist", "GET", f"/api/v1/artists/{artist.id}", None),
+        ("api_shows", "GET", "/api/v1/shows", None),
+        (
+            "api_create_shows",
+            "POST",
+            "/api/v1/shows/batch",
+            lambda: {"json": {"shows": tour_rows()}},
+        ),
+        (
+            "api_delete_venues",
+            "POST",
+            "/api/v1/venues/delete",
+            lambda: {"json": {"ids": [throwaway(Venue)]}},
+        ),
+        (
+            "api_delete_artists",
+            "POST",
+            "/api/v1/artists/delete",
+            lambda: {"json": {"ids": [throwaway(Artist)]}},
+        ),
+        ("api_search", "GET", "/api/v1/search/venues?q=venue", None),
+    ]
+
+
+def prepared(value):
+    return value() if callable(value) else value
+
+
+def send(client, method, path, options):
+    """Makes one request and reads the whole body, streamed ones included."""
+    response = client.open(path, method=method, **(options or {}))
+    try:
+        response.get_data()
+    finally:
+        response.close()
+    return response
+
+
+# HTML pages and the API routes serving the same data, compared by throughput.
+PAIRS = (
+    ("venues", "api_venue_areas"),
+    ("show_venue", "api_venue"),
+    ("shows", "api_shows"),
+)
+
+
+def throughput(client, path, requests):
+    """Requests per second for GET path, bodies included."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        send(client, "GET", path, None)
+    return requests / (time.perf_counter() - started)
+
+
+# Pages served by async views in the ASGI mode, compared with the sync app.
+ASYNC_PAGES = ("show_venue", "show_artist")
+
+
+def sync_throughput(paths, concurrency, requests):
+    """Requests per second of the WSGI app with concurrency threads."""
+    app = current_app._get_current_object()
+    local = threading.local()
+
+    def get(path):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        status = send(local.client, "GET", path, None).status_code
+        assert status == 200, f"GET {path} returned {status}"
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        started = time.perf_counter()
+        list(executor.map(get, itertools.islice(itertools.cycle(paths), requests)))
+    return requests / (time.perf_counter() - started)
+
+
+def asgi_throughput(paths, concurrency, requests):
+    """Requests per second of asgi.application with concurrency requests in
+    flight on one event loop."""
+    application = AsyncApp(current_app._get_current_object())
+
+    async def get(path, slots):
+        async with slots:
+            statuses = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"host", b"localhost")],
+            }
+            await application(scope, receive, send)
+            assert statuses == [200], f"GET {path} returned {statuses}"
+
+    async def load():
+        slots = asyncio.Semaphore(concurrency)
+        await get(paths[0], slots)  # Opens the pool.
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                get(path, slots)
+                for path in itertools.islice(itertools.cycle(paths), requests)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        await application.dispose()
+        return requests / elapsed
+
+    return asyncio.run(load())
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def run(client, method, path, options, requests):
+    """Returns the query count and p50/p95 latency in ms of one route."""
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        send(client, method, prepared(path), prepared(options))
+        timings = []
+        for _ in range(requests):
+            target, arguments = prepared(path), prepared(options)
+            statements.clear()
+            started = time.perf_counter()
+            response = send(client, method, target, arguments)
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise click.ClickException(
+                    f"{method} {target} answered {response.status_code}."
+                )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return {
+        "queries": len(statements),
+        "p50": round(percentile(timings, 0.5), 2),
+        "p95": round(percentile(timings, 0.95), 2),
+    }
+
+
+def import_time(root, runs=3):
+    """Best-of-runs time in ms for a fresh interpreter to import the app,
+    and the slowest top-level imports, from python -X importtime."""
+    env = dict(os.environ)
+    # Measure what a web worker imports, not the CLI-only modules.
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app"],
+            cwd=root,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        modules = {}
+        total = None
+        for line in output.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if name.startswith("   ") and not name.startswith("    "):
+                    modules[name.strip()] = int(cumulative) / 1000
+                elif name.strip() == "app":
+                    total = int(cumulative) / 1000
+        if total is None:
+            raise click.ClickException("python -X importtime did not report app.")
+        if best is None or total < best[0]:
+            best = (total, sorted(modules.items(), key=lambda item: -item[1])[:5])
+    return best
+
+
+def query_plans():
+    """EXPLAIN output of the upcoming show filters, by Show column.
+
+    The filters should be served by ix_Show_venue_id_start_time and
+    ix_Show_artist_id_start_time rather than a scan of Show.
+    """
+    dialect = db.engine.dialect
+    explain = "EXPLAIN" if dialect.name == "postgresql" else "EXPLAIN QUERY PLAN"
+    now = datetime.now()
+    plans = {}
+    for key in (Show.venue_id, Show.artist_id):
+        entity_id = db.session.execute(select(key).limit(1)).scalar() or 1
+        statement = select(func.count(Show.id)).where(
+            key == entity_id, is_upcoming(Show.start_time, now)
+        )
+        # Run through the driver with bound values, which every dialect can
+        # do, unlike rendering datetimes as SQL literals.
+        compiled = statement.compile(dialect=dialect)
+        params = compiled.params
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        rows = (
+            db.session.connection()
+            .exec_driver_sql(f"{explain} {compiled}", params)
+            .all()
+        )
+        plans[key.key] = [" ".join(str(value) for value in row) for row in rows]
+    return plans
+
+
+def legacy_format_datetime(value, format="medium"):
+    """The datetime filter before it cached its pattern, for comparison."""
+    import babel.dates
+    import dateutil.parser
+
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale="en")
+
+
+def datetime_filter_times(count):
+    """Seconds the old and the current filter take over count distinct
+    timestamps, every one a cache miss."""
+    from app import format_datetime
+
+    first = datetime(2020, 1, 1, 18, 0)
+    values = [first + timedelta(minutes=17 * index) for index in range(count)]
+    format_datetime.cache_clear()
+    started = time.perf_counter()
+    current = [format_datetime(value, "full") for value in values]
+    new = time.perf_counter() - started
+    started = time.perf_counter()
+    # The templates used to get strings and parse them back.
+    legacy = [legacy_format_datetime(str(value), "full") for value in values]
+    old = time.perf_counter() - started
+    if current != legacy:
+        raise click.ClickException("The datetime filters disagree.")
+    return old, new
+
+
+def regressions(results, baseline, tolerance):
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["queries"] > expected["queries"]:
+            yield f"{name}: {result['queries']} queries, baseline {expected['queries']}"
+        if result["p95"] > expected["p95"] * (1 + tolerance) + LATENCY_SLACK_MS:
+            yield f"{name}: p95 {result['p95']}ms, baseline {expected['p95']}ms"
+
+
+@click.command("bench")
+@click.option("--requests", "-n", default=20, show_default=True)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False),
+    default="bench-baseline.json",
+    show_default=True,
+)
+@click.option("--save", is_flag=True, help="Store this run as the new baseline.")
+@click.option(
+    "--tolerance",
+    default=0.5,
+    show_default=True,
+    help="Allowed p95 latency growth over the baseline, as a fraction.",
+)
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    default=False,
+    help="Serve from the data cache instead of measuring the queries.",
+)
+@click.option(
+    "--import-budget",
+    default=1000,
+    show_default=True,
+    help="Longest acceptable time in ms for a worker to import the app.",
+)
+@click.option(
+    "--datetime-filter",
+    default=0,
+    help="Also time the datetime filter against its uncached predecessor "
+    "over this many timestamps, e.g. 100000.",
+)
+@click.option(
+    "--concurrency",
+    default=0,
+    help="Also compare the venue and artist pages under the sync app and the "
+    "ASGI mode with this many requests in flight, e.g. 16.",
+)
+@with_appcontext
+def bench_command(
+    requests,
+    baseline,
+    save,
+    tolerance,
+    use_cache,
+    import_budget,
+    datetime_filter,
+    concurrency,
+):
+    """Measures the query count and latency of every route.
+
+    Also compares the throughput of the HTML pages with the API routes
+    serving the same data, and with --concurrency of the sync app with the
+    ASGI mode (asgi.py), and prints the query plans of the upcoming show
+    filters.
+
+    Exits with status 1 when a route runs more queries than in the baseline,
+    its p95 latency grew past the tolerance or importing the app takes longer
+    than the import budget. Submissions are included and add rows, so run it
+    against a seeded scratch database.
+    """
+    current_app.config["WTF_CSRF_ENABLED"] = False
+    backend = cache.backend
+    if not use_cache:
+        cache.backend = None
+    client = current_app.test_client()
+    results = {}
+    click.echo(f"{'route':<20} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        paths = {}
+        for name, method, path, options in cases():
+            paths[name] = path
+            results[name] = run(client, method, path, options, requests)
+            click.echo(
+                f"{name:<20} {results[name]['queries']:>7} "
+                f"{results[name]['p50']:>8.2f} {results[name]['p95']:>8.2f}"
+            )
+        for page, endpoint in PAIRS:
+            html = throughput(client, paths[page], requests)
+            api = throughput(client, paths[endpoint], requests)
+            click.echo(
+                f"{paths[page]} {html:.0f} req/s, {paths[endpoint]} "
+                f"{api:.0f} req/s ({api / html:.1f}x)"
+            )
+        if concurrency:
+            pages = [paths[name] for name in ASYNC_PAGES]
+            total = requests * concurrency
+            wsgi = sync_throughput(pages, concurrency, total)
+            asgi = asgi_throughput(pages, concurrency, total)
+            click.echo(
+                f"Venue and artist pages, {concurrency} in flight: sync "
+                f"{wsgi:.0f} req/s on {concurrency} threads, ASGI {asgi:.0f} "
+                f"req/s on one event loop ({asgi / wsgi:.1f}x)"
+            )
+    finally:
+        cache.backend = backend
+    for key, plan in query_plans().items():
+        click.echo(f"Upcoming shows by {key}:")
+        for line in plan:
+            click.echo(f"    {line}")
+    if datetime_filter:
+        old, new = datetime_filter_times(datetime_filter)
+        click.echo(
+            f"Formatting {datetime_filter} datetimes takes {new:.2f}s, "
+            f"{old:.2f}s before caching ({old / new:.1f}x)."
+        )
+    import_ms, heaviest = import_time(current_app.root_path)
+    click.echo(
+        f"Importing the app takes {import_ms:.0f}ms, slowest imports: "
+        + ", ".join(f"{name} {ms:.0f}ms" for name, ms in heaviest)
+    )
+    failures = []
+    if import_ms > import_budget:
+        failures.append(f"importing the app takes {import_ms:.0f}ms")
+    if save:
+        with open(baseline, "w") as destination:
+            json.dump(results, destination, indent=2, sort_keys=True)
+        click.echo(f"Saved the baseline to {baseline}.")
+    elif not os.path.exists(baseline):
+        click.echo(f"No baseline at {baseline}, run with --save to store one.")
+    else:
+        with open(baseline) as source:
+            failures.extend(regressions(results, json.load(source), tolerance))
+    for failure in failures:
+        click.echo(f"Regression: {failure}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("No regressions.")
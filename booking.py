@@ -0,0 +1,245 @@
+# ----------------------------------------------------------------------------#
+# Show booking.
+# ----------------------------------------------------------------------------#
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from sqlalchemy import literal, or_, select, union_all
+
+from cache import affected
+from counters import refresh
+from forms import SHOW_MAX_MINUTES, ShowForm, describe_errors, validate_row
+from models import db, Venue, Artist, Show
+
+# Rows per multi-row INSERT, within SQLite's 999 bound parameters.
+INSERT_CHUNK = 150
+
+MAX_DURATION = timedelta(minutes=SHOW_MAX_MINUTES)
+
+
+class BookingError(ValueError):
+    """A show that cannot be booked; conflicts lists the shows in the way."""
+
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+def show_values(data):
+    """Show column values from validated ShowForm data."""
+    try:
+        venue_id, artist_id = int(data["venue_id"]), int(data["artist_id"])
+    except (TypeError, ValueError):
+        raise BookingError("Venue and artist IDs must be numbers.")
+    minutes = data.get("duration") or 0
+    if not 0 < minutes <= SHOW_MAX_MINUTES:
+        raise BookingError(f"Shows last from 1 to {SHOW_MAX_MINUTES} minutes.")
+    return {
+        "venue_id": venue_id,
+        "artist_id": artist_id,
+        "start_time": data["start_time"],
+        "end_time": data["start_time"] + timedelta(minutes=minutes),
+    }
+
+
+def overlapping(key, entity_id, start_time, end_time):
+    # No show lasts longer than MAX_DURATION, so only shows starting in
+    # (start_time - MAX_DURATION, end_time) can overlap: a bounded range on the
+    # (venue_id, start_time) and (artist_id, start_time) indexes, however long
+    # the history.
+    return select(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time
+    ).where(
+        key == entity_id,
+        Show.start_time > start_time - MAX_DURATION,
+        Show.start_time < end_time,
+        Show.end_time > start_time,
+    )
+
+
+def conflicts(venue_id, artist_id, start_time, end_time):
+    """Stored shows overlapping the slot at the venue or for the artist."""
+    rows = db.session.execute(
+        union_all(
+            overlapping(Show.venue_id, venue_id, start_time, end_time),
+            overlapping(Show.artist_id, artist_id, start_time, end_time),
+        )
+    ).all()
+    return list({row.id: row for row in rows}.values())
+
+
+def describe(conflict):
+    return (
+        f"show {conflict.id} (venue {conflict.venue_id}, artist "
+        f"{conflict.artist_id}) from {conflict.start_time:%Y-%m-%d %H:%M} to "
+        f"{conflict.end_time:%Y-%m-%d %H:%M}"
+    )
+
+
+def book(data):
+    """Adds the show described by ShowForm data to the session.
+
+    Raises BookingError when the venue or artist does not exist or either is
+    already booked at that time. On PostgreSQL the exclusion constraints of
+    migration 6a2d8e4b1c97 also reject overlaps committed concurrently.
+    """
+    values = show_values(data)
+    existing = db.session.execute(
+        select(
+            select(Venue.id).where(Venue.id == values["venue_id"]).exists(),
+            select(Artist.id).where(Artist.id == values["artist_id"]).exists(),
+        )
+    ).one()
+    for model, key, exists in zip((Venue, Artist), ("venue_id", "artist_id"), existing):
+        if not exists:
+            raise BookingError(f"{model.__name__} {values[key]} does not exist.")
+    found = conflicts(
+        values["venue_id"],
+        values["artist_id"],
+        values["start_time"],
+        values["end_time"],
+    )
+    if found:
+        raise BookingError(
+            "The slot is taken by " + ", ".join(map(describe, found)) + ".", found
+        )
+    show = Show(**values)
+    db.session.add(show)
+    return show
+
+
+class Timeline:
+    """In-memory counterpart of the overlap query, for checking bookings
+    against each other before they reach the database.
+
+    Intervals are kept sorted by start, so a lookup bisects to the ones
+    starting within MAX_DURATION before the slot ends.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+
+    def add(self, start_time, end_time, item):
+        index = bisect_right(self.starts, start_time)
+        self.starts.insert(index, start_time)
+        self.intervals.insert(index, (start_time, end_time, item))
+
+    def overlapping(self, start_time, end_time):
+        low = bisect_right(self.starts, start_time - MAX_DURATION)
+        high = bisect_left(self.starts, end_time)
+        return [item for _, end, item in self.intervals[low:high] if end > start_time]
+
+
+def missing_entities(candidates):
+    """The (kind, id) pairs referenced by candidates that do not exist, from
+    one query over both tables."""
+    wanted = {
+        (kind, values[f"{kind}_id"])
+        for _, values in candidates
+        for kind in ("venue", "artist")
+    }
+    found = db.session.execute(
+        union_all(
+            select(literal("venue"), Venue.id).where(
+                Venue.id.in_({id for kind, id in wanted if kind == "venue"})
+            ),
+            select(literal("artist"), Artist.id).where(
+                Artist.id.in_({id for kind, id in wanted if kind == "artist"})
+            ),
+        )
+    ).all()
+    return wanted - {tuple(row) for row in found}
+
+
+def stored_timelines(candidates):
+    """Timelines of the stored shows of every venue and artist in candidates
+    around the batch's time span, loaded with one query."""
+    venue_ids = {values["venue_id"] for _, values in candidates}
+    artist_ids = {values["artist_id"] for _, values in candidates}
+    earliest = min(values["start_time"] for _, values in candidates)
+    latest = max(values["end_time"] for _, values in candidates)
+    timelines = {}
+    for row in db.session.execute(
+        select(
+            Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time
+        ).where(
+            or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+            Show.start_time > earliest - MAX_DURATION,
+            Show.start_time < latest,
+        )
+    ):
+        for key in (("venue", row.venue_id), ("artist", row.artist_id)):
+            timelines.setdefault(key, Timeline()).add(
+                row.start_time, row.end_time, describe(row)
+            )
+    return timelines
+
+
+def book_many(rows, atomic=False):
+    """Books a batch of shows, e.g. a tour, from ShowForm-style dicts.
+
+    Every row is checked against the stored shows and the rows before it in
+    one pass. Valid rows are inserted with multi-row INSERTs in the current
+    transaction, unless atomic is set and some row failed. Returns the
+    indexes of the booked rows and an error message per rejected row index;
+    messages number rows from 1.
+    """
+    errors = {}
+    candidates = []
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise BookingError("Expected the fields of one show.")
+            data, row_errors = validate_row(ShowForm, row)
+            if row_errors:
+                raise BookingError(describe_errors(row_errors))
+            candidates.append((index, show_values(data)))
+        except BookingError as error:
+            errors[index] = str(error)
+    if candidates:
+        missing = missing_entities(candidates)
+        timelines = stored_timelines(candidates)
+        accepted = []
+        for index, values in candidates:
+            keys = [(kind, values[f"{kind}_id"]) for kind in ("venue", "artist")]
+            unknown = [
+                f"{kind.title()} {id}" for kind, id in keys if (kind, id) in missing
+            ]
+            if unknown:
+                errors[index] = " and ".join(unknown) + (
+                    " does not exist." if len(unknown) == 1 else " do not exist."
+                )
+                continue
+            taken = [
+                conflict
+                for key in keys
+                for conflict in timelines.setdefault(key, Timeline()).overlapping(
+                    values["start_time"], values["end_time"]
+                )
+            ]
+            if taken:
+                errors[index] = (
+                    "The slot is taken by " + ", ".join(dict.fromkeys(taken)) + "."
+                )
+                continue
+            for key in keys:
+                timelines[key].add(
+                    values["start_time"], values["end_time"], f"row {index + 1}"
+                )
+            accepted.append((index, values))
+        candidates = accepted
+    if not candidates or (atomic and errors):
+        return [], errors
+    values = [values for _, values in candidates]
+    for offset in range(0, len(values), INSERT_CHUNK):
+        db.session.execute(
+            Show.__table__.insert().values(values[offset : offset + INSERT_CHUNK])
+        )
+    # Core inserts bypass the session events behind the counters and the cache.
+    refresh(Venue, {row["venue_id"] for row in values})
+    refresh(Artist, {row["artist_id"] for row in values})
+    stale = db.session.info.setdefault("stale", set())
+    for row in values:
+        stale |= affected(Show, venue_id=row["venue_id"], artist_id=row["artist_id"])
+    return [index for index, _ in candidates], errors
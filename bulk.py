@@ -0,0 +1,187 @@
+# ----------------------------------------------------------------------------#
+# Bulk import and export.
+# ----------------------------------------------------------------------------#
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+
+from booking import book_many
+from cache import cache
+from forms import VenueForm, ArtistForm, ShowForm, validate_row
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+
+KINDS = {
+    "venues": (Venue, VenueForm, venue_genres, "venue_id"),
+    "artists": (Artist, ArtistForm, artist_genres, "artist_id"),
+    "shows": (Show, ShowForm, None, None),
+}
+# Bookkeeping columns maintained by the database, never imported or exported.
+SKIPPED = {"version", "updated_at"}
+
+
+def file_format(path, given):
+    if given:
+        return given
+    return "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+
+
+def read_rows(source, format):
+    if format == "jsonl":
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        for row in csv.DictReader(source):
+            # Multi-valued genres are ";"-separated in CSV files.
+            if "genres" in row:
+                row["genres"] = [name for name in row["genres"].split(";") if name]
+            yield row
+
+
+def insert_batch(model, rows):
+    genres = {
+        genre.name: genre
+        for genre in Genre.from_names([name for row in rows for name in row["genres"]])
+    }
+    db.session.add_all(
+        model(**dict(row, genres=[genres[name] for name in row["genres"]]))
+        for row in rows
+    )
+    db.session.flush()
+
+
+def write_batch(model, rows, rejects):
+    """Inserts rows in one go, isolating bad rows one by one if that fails."""
+    try:
+        with db.session.begin_nested():
+            insert_batch(model, rows)
+        return len(rows)
+    except DBAPIError:
+        pass
+    written = 0
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                insert_batch(model, [row])
+            written += 1
+        except DBAPIError as error:
+            reject(rejects, row, str(error.orig))
+    return written
+
+
+def reject(rejects, row, errors):
+    rejects.write(json.dumps({"row": row, "errors": errors}, default=str) + "\n")
+
+
+@click.command("import")
+@click.argument("kind", type=click.Choice(list(KINDS)))
+@click.argument("source", type=click.File("r"))
+@click.option(
+    "--format", type=click.Choice(["csv", "jsonl"]), help="Default: by extension."
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option(
+    "--rejects",
+    type=click.Path(dir_okay=False),
+    help="Dead-letter file for rejected rows. Default: SOURCE.rejects.jsonl.",
+)
+@with_appcontext
+def import_command(kind, source, format, batch_size, rejects):
+    """Imports venues, artists or shows from a CSV or JSON Lines file."""
+    model, form_class, _, _ = KINDS[kind]
+    format = file_format(source.name, format)
+    rejects = rejects or f"{os.path.splitext(source.name)[0]}.rejects.jsonl"
+    started = time.perf_counter()
+    read = written = 0
+    with open(rejects, "w") as dead_letters:
+        rows = read_rows(source, format)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            read += len(batch)
+            if model is Show:
+                # Checked like a tour: against the stored shows and the rows
+                # before them, unknown venues and artists included.
+                booked, errors = book_many(batch)
+                for index, message in errors.items():
+                    reject(dead_letters, batch[index], {"show": [message]})
+                written += len(booked)
+            else:
+                valid = []
+                for row in batch:
+                    data, errors = validate_row(form_class, row)
+                    if errors:
+                        reject(dead_letters, row, errors)
+                    else:
+                        valid.append(data)
+                if valid:
+                    written += write_batch(model, valid, dead_letters)
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+            click.echo(
+                f"{read} rows read, {written} written, {read / elapsed:.0f} rows/s"
+            )
+    # Core inserts bypass the session events, drop every cached page instead.
+    for namespace in ("venues", "venue", "artists", "artist", "shows"):
+        cache.invalidate(namespace)
+    click.echo(f"Done: {written} imported, {read - written} rejected into {rejects}.")
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(list(KINDS)))
+@click.argument("destination", type=click.File("w"))
+@click.option(
+    "--format", type=click.Choice(["csv", "jsonl"]), help="Default: by extension."
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def export_command(kind, destination, format, batch_size):
+    """Exports venues, artists or shows to a CSV or JSON Lines file.
+
+    Rows are streamed from a server-side cursor in batches, so memory stays
+    flat however large the table is.
+    """
+    model, _, association, key = KINDS[kind]
+    format = file_format(destination.name, format)
+    columns = [
+        column for column in model.__table__.columns if column.key not in SKIPPED
+    ]
+    fields = [column.key for column in columns] + (
+        ["genres"] if association is not None else []
+    )
+    if format == "csv":
+        writer = csv.DictWriter(destination, fieldnames=fields)
+        writer.writeheader()
+    result = db.session.execute(
+        select(*columns).order_by(model.id).execution_options(stream_results=True)
+    )
+    exported = 0
+    for partition in result.partitions(batch_size):
+        rows = [dict(row._mapping) for row in partition]
+        if association is not None:
+            genres = {}
+            for owner_id, name in db.session.execute(
+                select(association.c[key], Genre.name)
+                .join(Genre, Genre.id == association.c.genre_id)
+                .where(association.c[key].in_([row["id"] for row in rows]))
+            ):
+                genres.setdefault(owner_id, []).append(name)
+            for row in rows:
+                row["genres"] = genres.get(row["id"], [])
+        for row in rows:
+            if format == "csv":
+                if "genres" in row:
+                    row["genres"] = ";".join(row["genres"])
+                writer.writerow(row)
+            else:
+                destination.write(json.dumps(row, default=str) + "\n")
+        exported += len(rows)
+    click.echo(f"Exported {exported} {kind}.", err=True)
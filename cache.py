@@ -0,0 +1,229 @@
+# ----------------------------------------------------------------------------#
+# Data cache.
+# ----------------------------------------------------------------------------#
+import asyncio
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask.signals import Namespace
+from sqlalchemy import event
+
+from models import Venue, Artist, Show
+from routing import RoutingSession, primary
+
+MISSING = object()
+
+# Sent with namespace= and hit= on every lookup, for the metrics.
+cache_lookup = Namespace().signal("cache-lookup")
+
+
+class LRUCache:
+    """In-process LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def counter(self, key):
+        return self.counters.get(key, 0)
+
+    def incr(self, key):
+        # Counters live outside the LRU so a generation is never evicted.
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RedisCache:
+    """Cache on a Redis-compatible client (redis.Redis, fakeredis, a stub)."""
+
+    def __init__(self, client, ttl=60):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.get(key)
+        return MISSING if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, pickle.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class Cache:
+    """Data cache for the listing and detail pages.
+
+    Keys are "<namespace>:<generation>:<suffix>", e.g. "venue:3:12" for venue
+    12. A single entry is dropped by deleting its key, a whole namespace
+    (every /shows page, say) by bumping its generation.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        ttl = app.config["CACHE_DEFAULT_TTL"]
+        if app.config["CACHE_TYPE"] == "redis":
+            import redis
+
+            self.backend = RedisCache(
+                redis.Redis.from_url(app.config["CACHE_REDIS_URL"]), ttl
+            )
+        elif app.config["CACHE_TYPE"] == "simple":
+            self.backend = LRUCache(app.config["CACHE_MAXSIZE"], ttl)
+        app.extensions["cache"] = self
+
+    def generation(self, namespace):
+        return self.backend.counter(f"gen:{namespace}")
+
+    def key(self, namespace, suffix):
+        return f"{namespace}:{self.generation(namespace)}:{suffix}"
+
+    def get_or_set(self, namespace, suffix, creator, ttl=None):
+        """Returns the cached value, computing and storing it on a miss.
+
+        None results (e.g. an unknown id) are not cached. ttl defaults to
+        CACHE_DEFAULT_TTL. Misses are computed on the primary: a lagging
+        replica would put data back that a commit just invalidated.
+        """
+        if self.backend is None:
+            return creator()
+        key = self.key(namespace, suffix)
+        value = self.backend.get(key)
+        cache_lookup.send(self, namespace=namespace, hit=value is not MISSING)
+        if value is MISSING:
+            with primary():
+                value = creator()
+            if value is not None:
+                self.backend.set(key, value, ttl)
+        return value
+
+    async def get_or_set_async(self, namespace, suffix, creator):
+        """get_or_set() for a creator returning an awaitable. The backend
+        calls run in a worker thread, so a Redis round trip does not hold up
+        the event loop."""
+        if self.backend is None:
+            return await creator()
+        key = await asyncio.to_thread(self.key, namespace, suffix)
+        value = await asyncio.to_thread(self.backend.get, key)
+        cache_lookup.send(self, namespace=namespace, hit=value is not MISSING)
+        if value is MISSING:
+            value = await creator()
+            if value is not None:
+                await asyncio.to_thread(self.backend.set, key, value)
+        return value
+
+    def get_or_set_fragment(self, key, creator, ttl=None):
+        """get_or_set() for keys that carry their own version, such as a
+        page's ETag: new versions get new keys, so there is no generation to
+        look up and a hit is one round trip."""
+        if self.backend is None:
+            return creator()
+        key = f"fragment:{key}"
+        value = self.backend.get(key)
+        cache_lookup.send(self, namespace="fragment", hit=value is not MISSING)
+        if value is MISSING:
+            value = creator()
+            self.backend.set(key, value, ttl)
+        return value
+
+    def invalidate(self, namespace, suffix=None):
+        if self.backend is None:
+            return
+        if suffix is None:
+            self.backend.incr(f"gen:{namespace}")
+        else:
+            self.backend.delete(self.key(namespace, suffix))
+
+
+cache = Cache()
+
+
+def affected(model, entity_id=None, venue_id=None, artist_id=None):
+    """Cache entries a change to a row of model makes stale, as
+    (namespace, suffix). Venues and artists are identified by entity_id,
+    shows by their venue_id and artist_id."""
+    if issubclass(model, Show):
+        return {
+            ("venue", venue_id),
+            ("artist", artist_id),
+            ("venues", None),
+            ("shows", None),
+        }
+    if issubclass(model, Venue):
+        # Venue names also appear on artist pages and the shows listing.
+        return {
+            ("venue", entity_id),
+            ("venues", None),
+            ("shows", None),
+            ("artist", None),
+        }
+    if issubclass(model, Artist):
+        return {
+            ("artist", entity_id),
+            ("artists", None),
+            ("shows", None),
+            ("venue", None),
+        }
+    return set()
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def collect_stale(session, flush_context):
+    stale = session.info.setdefault("stale", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        stale |= affected(
+            type(instance),
+            getattr(instance, "id", None),
+            getattr(instance, "venue_id", None),
+            getattr(instance, "artist_id", None),
+        )
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def invalidate_stale(session):
+    for namespace, suffix in session.info.pop("stale", ()):
+        cache.invalidate(namespace, suffix)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def discard_stale(session):
+    session.info.pop("stale", None)
@@ -0,0 +1,77 @@
+# ----------------------------------------------------------------------------#
+# Conditional requests.
+# ----------------------------------------------------------------------------#
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from itertools import zip_longest
+
+from flask import g, make_response, request
+
+
+def validators(state):
+    """The ETag and Last-Modified of a version() tuple.
+
+    The ETag is also kept as g.etag, which keys the page's template fragments.
+    Timestamps are UTC, except a "last_started" column: show times are local.
+    """
+    etag = g.etag = hashlib.md5(repr(tuple(state)).encode()).hexdigest()
+    fields = getattr(state, "_fields", ())
+    timestamps = []
+    for field, value in zip_longest(fields, state):
+        if isinstance(value, datetime):
+            if field == "last_started":
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            timestamps.append(value)
+    last_modified = (
+        max(timestamps).replace(tzinfo=timezone.utc, microsecond=0)
+        if timestamps
+        else None
+    )
+    return etag, last_modified
+
+
+def is_fresh(etag, last_modified):
+    """Whether the client's copy, as described by the request, is current."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return (
+        last_modified is not None
+        and request.if_modified_since is not None
+        and last_modified <= request.if_modified_since
+    )
+
+
+def revalidated(rv, etag, last_modified):
+    response = make_response(rv)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let browsers and the CDN store the page but revalidate on every use.
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(version):
+    """Answers 304 Not Modified when the client's copy is still current.
+
+    version(**view_args) returns a tuple of everything the page depends on
+    (row versions, counts, timestamps) from one cheap query, or None when
+    the page should be rendered regardless (e.g. to produce a 404). The
+    ETag is a hash of that tuple and Last-Modified its newest timestamp, so
+    the view itself, and the show rows it loads, only run on a change.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            state = version(*args, **kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            etag, last_modified = validators(state)
+            if is_fresh(etag, last_modified):
+                return revalidated(("", 304), etag, last_modified)
+            return revalidated(view(*args, **kwargs), etag, last_modified)
+
+        return wrapper
+
+    return decorator
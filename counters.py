@@ -0,0 +1,149 @@
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select, update
+
+from models import db, Venue, Artist, Show, is_upcoming
+from routing import RoutingSession
+
+# Show column pointing at each entity that carries counters.
+OWNERS = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+
+def live_counts(model, now):
+    """Correlated upcoming/past show counts for model, the source of truth."""
+    key = OWNERS[model]
+    upcoming = (
+        select(func.count(Show.id))
+        .where(key == model.id, is_upcoming(Show.start_time, now))
+        .scalar_subquery()
+    )
+    past = (
+        select(func.count(Show.id))
+        .where(key == model.id, ~is_upcoming(Show.start_time, now))
+        .scalar_subquery()
+    )
+    return upcoming, past
+
+
+def refresh(model, ids=None, now=None, session=None):
+    """Recomputes the counters of model rows in ids (all rows if None)."""
+    upcoming, past = live_counts(model, now or datetime.now())
+    statement = update(model).values(
+        upcoming_shows_count=upcoming, past_shows_count=past
+    )
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+        statement = statement.where(model.id.in_(ids))
+    (session or db.session).execute(
+        statement.execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def collect_orphaned_counts(session, flush_context, instances):
+    # Shows of a deleted venue or artist go with it, so the counters of the
+    # other side have to be recomputed once the delete has been flushed.
+    for instance in session.deleted:
+        for model, other in ((Venue, Artist), (Artist, Venue)):
+            if isinstance(instance, model):
+                ids = session.info.setdefault("recount", {}).setdefault(other, set())
+                ids.update(
+                    session.execute(
+                        select(OWNERS[other]).where(OWNERS[model] == instance.id)
+                    ).scalars()
+                )
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def count_shows(session, flush_context):
+    now = datetime.now()
+    deltas = Counter()
+    for instances, sign in ((session.new, 1), (session.deleted, -1)):
+        for show in instances:
+            if isinstance(show, Show):
+                column = (
+                    "upcoming_shows_count"
+                    if is_upcoming(show.start_time, now)
+                    else "past_shows_count"
+                )
+                deltas[Venue, show.venue_id, column] += sign
+                deltas[Artist, show.artist_id, column] += sign
+    for (model, entity_id, column), delta in deltas.items():
+        if delta:
+            session.execute(
+                update(model)
+                .where(model.id == entity_id)
+                .values({column: getattr(model, column) + delta})
+                .execution_options(synchronize_session=False)
+            )
+    for model, ids in session.info.pop("recount", {}).items():
+        refresh(model, ids, now, session)
+
+
+counters_cli = AppGroup("counters", help="Maintain the upcoming/past show counters.")
+
+
+@counters_cli.command("roll")
+@click.option(
+    "--since",
+    default=15,
+    show_default=True,
+    help="Minutes to look back for shows that started; cover the job interval.",
+)
+def roll(since):
+    """Moves shows that have started from the upcoming to the past counters.
+
+    Only entities with a show that started in the window are recomputed, so
+    this is cheap to run from cron every few minutes and safe to overlap.
+    """
+    now = datetime.now()
+    started = Show.start_time.between(now - timedelta(minutes=since), now)
+    for model, key in OWNERS.items():
+        ids = db.session.execute(select(key).where(started).distinct()).scalars()
+        refresh(model, ids, now)
+    db.session.commit()
+
+
+@counters_cli.command("check")
+@click.option("--fix", is_flag=True, help="Recompute the mismatching rows.")
+def check(fix):
+    """Compares the stored counters with live aggregates."""
+    now = datetime.now()
+    mismatches = 0
+    for model in OWNERS:
+        upcoming, past = live_counts(model, now)
+        rows = db.session.execute(
+            select(
+                model.id,
+                model.upcoming_shows_count,
+                upcoming,
+                model.past_shows_count,
+                past,
+            ).where(
+                (model.upcoming_shows_count != upcoming)
+                | (model.past_shows_count != past)
+            )
+        ).all()
+        for row in rows:
+            click.echo(
+                f"{model.__name__} {row[0]}: upcoming {row[1]} != {row[2]}, "
+                f"past {row[3]} != {row[4]}"
+            )
+        mismatches += len(rows)
+        if fix:
+            refresh(model, [row[0] for row in rows], now)
+    if fix:
+        db.session.commit()
+    click.echo(
+        f"{mismatches} mismatching rows{' fixed' if fix and mismatches else ''}."
+    )
+    if mismatches and not fix:
+        raise SystemExit(1)
@@ -0,0 +1,59 @@
+# ----------------------------------------------------------------------------#
+# Set-based deletes.
+# ----------------------------------------------------------------------------#
+from sqlalchemy import delete, select
+
+from cache import affected
+from counters import OWNERS, refresh
+from models import db, Venue, Artist, Show, venue_genres, artist_genres
+
+# Genre links of each model, by the column pointing at it.
+GENRE_LINKS = {Venue: venue_genres.c.venue_id, Artist: artist_genres.c.artist_id}
+COUNTERPARTS = {Venue: Artist, Artist: Venue}
+# ids per IN list, within SQLite's 999 bound parameters.
+CHUNK = 500
+
+
+def delete_entities(model, ids):
+    """Deletes the venues or artists in ids with their shows and genre links.
+
+    Runs a handful of DELETEs per chunk of ids without loading any object,
+    recomputes the counters of the other side of the deleted shows and queues
+    the stale cache entries for invalidation on commit. Returns the ids that
+    existed.
+    """
+    ids = sorted(set(ids))
+    other = COUNTERPARTS[model]
+    key = OWNERS[model]
+    deleted = []
+    for offset in range(0, len(ids), CHUNK):
+        existing = (
+            db.session.execute(
+                select(model.id).where(model.id.in_(ids[offset : offset + CHUNK]))
+            )
+            .scalars()
+            .all()
+        )
+        if not existing:
+            continue
+        counterparts = (
+            db.session.execute(
+                select(OWNERS[other]).where(key.in_(existing)).distinct()
+            )
+            .scalars()
+            .all()
+        )
+        # ON DELETE CASCADE would remove the shows and links on PostgreSQL, but
+        # SQLite does not enforce foreign keys unless asked to per connection.
+        for statement in (
+            delete(Show).where(key.in_(existing)),
+            delete(GENRE_LINKS[model].table).where(GENRE_LINKS[model].in_(existing)),
+            delete(model).where(model.id.in_(existing)),
+        ):
+            db.session.execute(statement.execution_options(synchronize_session=False))
+        refresh(other, counterparts)
+        deleted.extend(existing)
+    stale = db.session.info.setdefault("stale", set())
+    for entity_id in deleted:
+        stale |= affected(model, entity_id)
+    return deleted
@@ -7,7 +7,8 @@ from fabric.contrib.console import confirm
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "FLASK_APP=app.py FLASK_ENV=development flask bench --baseline bench-baseline.json",
+            capture=True,
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -40,7 +41,7 @@ def heroku():
 
 
 def heroku_test():
-    local("heroku run python test_tasks.py -v && heroku run python test_users.py -v")
+    local("heroku run flask bench --requests 5")
 
 
 def deploy():
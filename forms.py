@@ -1,20 +1,109 @@
 from datetime import datetime
 from flask_wtf import Form
+from flask_wtf.file import FileField, FileRequired
+from werkzeug.datastructures import MultiDict
 from wtforms import (
     StringField,
     SelectField,
     SelectMultipleField,
     DateTimeField,
     BooleanField,
+    IntegerField,
+)
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange
+
+# Show length in minutes: the default, and the longest the booking engine's
+# overlap queries account for.
+SHOW_DEFAULT_MINUTES = 120
+SHOW_MAX_MINUTES = 24 * 60
+
+STATE_CHOICES = (
+    ("AL", "AL"),
+    ("AK", "AK"),
+    ("AZ", "AZ"),
+    ("AR", "AR"),
+    ("CA", "CA"),
+    ("CO", "CO"),
+    ("CT", "CT"),
+    ("DE", "DE"),
+    ("DC", "DC"),
+    ("FL", "FL"),
+    ("GA", "GA"),
+    ("HI", "HI"),
+    ("ID", "ID"),
+    ("IL", "IL"),
+    ("IN", "IN"),
+    ("IA", "IA"),
+    ("KS", "KS"),
+    ("KY", "KY"),
+    ("LA", "LA"),
+    ("ME", "ME"),
+    ("MT", "MT"),
+    ("NE", "NE"),
+    ("NV", "NV"),
+    ("NH", "NH"),
+    ("NJ", "NJ"),
+    ("NM", "NM"),
+    ("NY", "NY"),
+    ("NC", "NC"),
+    ("ND", "ND"),
+    ("OH", "OH"),
+    ("OK", "OK"),
+    ("OR", "OR"),
+    ("MD", "MD"),
+    ("MA", "MA"),
+    ("MI", "MI"),
+    ("MN", "MN"),
+    ("MS", "MS"),
+    ("MO", "MO"),
+    ("PA", "PA"),
+    ("RI", "RI"),
+    ("SC", "SC"),
+    ("SD", "SD"),
+    ("TN", "TN"),
+    ("TX", "TX"),
+    ("UT", "UT"),
+    ("VT", "VT"),
+    ("VA", "VA"),
+    ("WA", "WA"),
+    ("WV", "WV"),
+    ("WI", "WI"),
+    ("WY", "WY"),
+)
+
+GENRE_CHOICES = (
+    ("Alternative", "Alternative"),
+    ("Blues", "Blues"),
+    ("Classical", "Classical"),
+    ("Country", "Country"),
+    ("Electronic", "Electronic"),
+    ("Folk", "Folk"),
+    ("Funk", "Funk"),
+    ("Hip-Hop", "Hip-Hop"),
+    ("Heavy Metal", "Heavy Metal"),
+    ("Instrumental", "Instrumental"),
+    ("Jazz", "Jazz"),
+    ("Musical Theatre", "Musical Theatre"),
+    ("Pop", "Pop"),
+    ("Punk", "Punk"),
+    ("R&B", "R&B"),
+    ("Reggae", "Reggae"),
+    ("Rock n Roll", "Rock n Roll"),
+    ("Soul", "Soul"),
+    ("Other", "Other"),
 )
-from wtforms.validators import DataRequired, AnyOf, URL
 
 
 class ShowForm(Form):
     artist_id = StringField("artist_id")
     venue_id = StringField("venue_id")
     start_time = DateTimeField(
-        "start_time", validators=[DataRequired()], default=datetime.today()
+        "start_time", validators=[DataRequired()], default=datetime.today
+    )
+    duration = IntegerField(
+        "duration",
+        validators=[NumberRange(min=1, max=SHOW_MAX_MINUTES)],
+        default=SHOW_DEFAULT_MINUTES,
     )
 
 
@@ -24,59 +113,7 @@ class VenueForm(Form):
     state = SelectField(
         "state",
         validators=[DataRequired()],
-        choices=[
-            ("AL", "AL"),
-            ("AK", "AK"),
-            ("AZ", "AZ"),
-            ("AR", "AR"),
-            ("CA", "CA"),
-            ("CO", "CO"),
-            ("CT", "CT"),
-            ("DE", "DE"),
-            ("DC", "DC"),
-            ("FL", "FL"),
-            ("GA", "GA"),
-            ("HI", "HI"),
-            ("ID", "ID"),
-            ("IL", "IL"),
-            ("IN", "IN"),
-            ("IA", "IA"),
-            ("KS", "KS"),
-            ("KY", "KY"),
-            ("LA", "LA"),
-            ("ME", "ME"),
-            ("MT", "MT"),
-            ("NE", "NE"),
-            ("NV", "NV"),
-            ("NH", "NH"),
-            ("NJ", "NJ"),
-            ("NM", "NM"),
-            ("NY", "NY"),
-            ("NC", "NC"),
-            ("ND", "ND"),
-            ("OH", "OH"),
-            ("OK", "OK"),
-            ("OR", "OR"),
-            ("MD", "MD"),
-            ("MA", "MA"),
-            ("MI", "MI"),
-            ("MN", "MN"),
-            ("MS", "MS"),
-            ("MO", "MO"),
-            ("PA", "PA"),
-            ("RI", "RI"),
-            ("SC", "SC"),
-            ("SD", "SD"),
-            ("TN", "TN"),
-            ("TX", "TX"),
-            ("UT", "UT"),
-            ("VT", "VT"),
-            ("VA", "VA"),
-            ("WA", "WA"),
-            ("WV", "WV"),
-            ("WI", "WI"),
-            ("WY", "WY"),
-        ],
+        choices=STATE_CHOICES,
     )
     address = StringField("address", validators=[DataRequired()])
     phone = StringField("phone")
@@ -85,27 +122,7 @@ class VenueForm(Form):
         # TODO implement enum restriction
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=GENRE_CHOICES,
     )
     facebook_link = StringField("facebook_link", validators=[URL()])
     website_link = StringField("website_link")
@@ -121,59 +138,7 @@ class ArtistForm(Form):
     state = SelectField(
         "state",
         validators=[DataRequired()],
-        choices=[
-            ("AL", "AL"),
-            ("AK", "AK"),
-            ("AZ", "AZ"),
-            ("AR", "AR"),
-            ("CA", "CA"),
-            ("CO", "CO"),
-            ("CT", "CT"),
-            ("DE", "DE"),
-            ("DC", "DC"),
-            ("FL", "FL"),
-            ("GA", "GA"),
-            ("HI", "HI"),
-            ("ID", "ID"),
-            ("IL", "IL"),
-            ("IN", "IN"),
-            ("IA", "IA"),
-            ("KS", "KS"),
-            ("KY", "KY"),
-            ("LA", "LA"),
-            ("ME", "ME"),
-            ("MT", "MT"),
-            ("NE", "NE"),
-            ("NV", "NV"),
-            ("NH", "NH"),
-            ("NJ", "NJ"),
-            ("NM", "NM"),
-            ("NY", "NY"),
-            ("NC", "NC"),
-            ("ND", "ND"),
-            ("OH", "OH"),
-            ("OK", "OK"),
-            ("OR", "OR"),
-            ("MD", "MD"),
-            ("MA", "MA"),
-            ("MI", "MI"),
-            ("MN", "MN"),
-            ("MS", "MS"),
-            ("MO", "MO"),
-            ("PA", "PA"),
-            ("RI", "RI"),
-            ("SC", "SC"),
-            ("SD", "SD"),
-            ("TN", "TN"),
-            ("TX", "TX"),
-            ("UT", "UT"),
-            ("VT", "VT"),
-            ("VA", "VA"),
-            ("WA", "WA"),
-            ("WV", "WV"),
-            ("WI", "WI"),
-            ("WY", "WY"),
-        ],
+        choices=STATE_CHOICES,
     )
     phone = StringField(
         # TODO implement validation logic for state
@@ -183,27 +148,7 @@ class ArtistForm(Form):
     genres = SelectMultipleField(
         "genres",
         validators=[DataRequired()],
-        choices=[
-            ("Alternative", "Alternative"),
-            ("Blues", "Blues"),
-            ("Classical", "Classical"),
-            ("Country", "Country"),
-            ("Electronic", "Electronic"),
-            ("Folk", "Folk"),
-            ("Funk", "Funk"),
-            ("Hip-Hop", "Hip-Hop"),
-            ("Heavy Metal", "Heavy Metal"),
-            ("Instrumental", "Instrumental"),
-            ("Jazz", "Jazz"),
-            ("Musical Theatre", "Musical Theatre"),
-            ("Pop", "Pop"),
-            ("Punk", "Punk"),
-            ("R&B", "R&B"),
-            ("Reggae", "Reggae"),
-            ("Rock n Roll", "Rock n Roll"),
-            ("Soul", "Soul"),
-            ("Other", "Other"),
-        ],
+        choices=GENRE_CHOICES,
     )
     facebook_link = StringField(
         # TODO implement enum restriction
@@ -216,3 +161,31 @@ class ArtistForm(Form):
     seeking_venue = BooleanField("seeking_venue")
 
     seeking_description = StringField("seeking_description")
+
+
+class TourForm(Form):
+    schedule = FileField("schedule", validators=[FileRequired()])
+    atomic = BooleanField("atomic")
+
+
+def formdata(row):
+    pairs = []
+    for key, value in row.items():
+        values = value if isinstance(value, list) else [value]
+        pairs.extend((key, "" if item is None else str(item)) for item in values)
+    return MultiDict(pairs)
+
+
+def validate_row(form_class, row):
+    """Validates a dict of field values with form_class's rules, without CSRF."""
+    form = form_class(formdata=formdata(row), meta={"csrf": False})
+    if not form.validate():
+        return None, form.errors
+    data = {key: value for key, value in form.data.items() if key != "csrf_token"}
+    return data, None
+
+
+def describe_errors(errors):
+    return "; ".join(
+        f"{field}: {', '.join(messages)}" for field, messages in errors.items()
+    )
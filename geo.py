@@ -0,0 +1,206 @@
+# ----------------------------------------------------------------------------#
+# Geocoding and nearby search.
+# ----------------------------------------------------------------------------#
+import csv
+import math
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, func, inspect, or_, select, update
+from werkzeug.utils import import_string
+
+from models import db, Venue
+
+# The radius earthdistance's earth() uses, so that SQLite and PostgreSQL
+# measure the same distances.
+EARTH_RADIUS_KM = 6378.168
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def place_name(text):
+    """Normalizes a free-text place name, so "new york " matches "New York".
+
+    Only for comparing: casefolding turns "McAllen" into "mcallen".
+    """
+    return " ".join(text.split()).casefold()
+
+
+def place_key(city, state):
+    return place_name(city), place_name(state)
+
+
+class GazetteerGeocoder:
+    """Places venues at the centre of their city, from a local CSV file.
+
+    Stand-in for a geocoding service. GEOCODER_GAZETTEER has city, state,
+    latitude and longitude columns.
+    """
+
+    def __init__(self, app):
+        self.places = {}
+        with open(app.config["GEOCODER_GAZETTEER"], newline="") as source:
+            for row in csv.DictReader(source):
+                self.places[place_key(row["city"], row["state"])] = (
+                    float(row["latitude"]),
+                    float(row["longitude"]),
+                )
+
+    def geocode(self, city, state, address):
+        """Returns (latitude, longitude), or None for unknown places."""
+        return self.places.get(place_key(city, state))
+
+
+GEOCODERS = {"gazetteer": GazetteerGeocoder}
+
+
+def geocoder(app):
+    """The GEOCODER provider: a name from GEOCODERS or "module:Class"."""
+    name = app.config["GEOCODER"]
+    return (GEOCODERS.get(name) or import_string(name))(app)
+
+
+@event.listens_for(Venue, "before_update")
+def forget_moved_coordinates(mapper, connection, venue):
+    # A venue that moved is out of nearby searches until it is geocoded again.
+    state = inspect(venue)
+    moved = any(
+        state.attrs[key].history.has_changes() for key in ("city", "state", "address")
+    )
+    if moved and not state.attrs.latitude.history.has_changes():
+        venue.latitude = venue.longitude = None
+
+
+@click.command("geocode")
+@click.option(
+    "--all", "everything", is_flag=True, help="Redo venues with coordinates too."
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def geocode_command(everything, batch_size):
+    """Fills in venue coordinates with the configured GEOCODER.
+
+    Each distinct address is looked up once. Venues the geocoder cannot place
+    keep no coordinates and are left out of nearby searches.
+    """
+    provider = geocoder(current_app)
+    query = select(Venue.id, Venue.city, Venue.state, Venue.address)
+    if not everything:
+        query = query.where(Venue.latitude.is_(None))
+    table = Venue.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("venue_id"))
+        .values(
+            latitude=bindparam("lat"),
+            longitude=bindparam("lon"),
+            version=table.c.version + 1,
+        )
+    )
+    looked_up = {}
+    rows = []
+    missed = 0
+    for venue in db.session.execute(query.order_by(Venue.id)).all():
+        key = (
+            place_key(venue.city, venue.state),
+            " ".join(venue.address.split()).lower(),
+        )
+        if key not in looked_up:
+            looked_up[key] = provider.geocode(venue.city, venue.state, venue.address)
+        if looked_up[key] is None:
+            missed += 1
+            continue
+        lat, lon = looked_up[key]
+        rows.append({"venue_id": venue.id, "lat": lat, "lon": lon})
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(statement, rows[offset : offset + batch_size])
+    stale = db.session.info.setdefault("stale", set())
+    stale.update(("venue", row["venue_id"]) for row in rows)
+    db.session.commit()
+    click.echo(
+        f"Geocoded {len(rows)} venues with {len(looked_up)} lookups, "
+        f"{missed} could not be placed."
+    )
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance (haversine)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """Filters on a box around the circle, served by ix_Venue_latitude_longitude."""
+    degrees = radius_km / KM_PER_DEGREE
+    south, north = max(lat - degrees, -90.0), min(lat + degrees, 90.0)
+    filters = [Venue.latitude.between(south, north)]
+    # Longitude degrees shrink towards the poles, so the widest span is at the
+    # box's edge furthest from the equator.
+    widest = max(abs(south), abs(north))
+    span = 180.0 if widest >= 90 else degrees / math.cos(math.radians(widest))
+    if span >= 180:
+        return filters
+    west, east = lon - span, lon + span
+    if west < -180:
+        filters.append(or_(Venue.longitude >= west + 360, Venue.longitude <= east))
+    elif east > 180:
+        filters.append(or_(Venue.longitude >= west, Venue.longitude <= east - 360))
+    else:
+        filters.append(Venue.longitude.between(west, east))
+    return filters
+
+
+def nearby(lat, lon, radius_km, limit):
+    """Venues within radius_km of (lat, lon), nearest first, in one statement.
+
+    Upcoming counts come from the counters maintained by counters.py.
+    """
+    columns = [
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.latitude,
+        Venue.longitude,
+        Venue.upcoming_shows_count.label("num_upcoming_shows"),
+    ]
+    if db.engine.dialect.name == "postgresql":
+        # Served by the earthdistance GiST index, see migration 8c4e1a7f2b95.
+        origin = func.ll_to_earth(lat, lon)
+        point = func.ll_to_earth(Venue.latitude, Venue.longitude)
+        distance = func.earth_distance(origin, point)
+        rows = (
+            db.session.query(*columns, (distance / 1000).label("distance_km"))
+            .filter(
+                func.earth_box(origin, radius_km * 1000).op("@>")(point),
+                distance <= radius_km * 1000,
+            )
+            .order_by(distance, Venue.id)
+            .limit(limit)
+            .all()
+        )
+        found = [(row.distance_km, row) for row in rows]
+    else:
+        rows = db.session.query(*columns).filter(*bounding_box(lat, lon, radius_km))
+        found = sorted(
+            ((distance_km(lat, lon, row.latitude, row.longitude), row) for row in rows),
+            key=lambda pair: (pair[0], pair[1].id),
+        )
+        found = [pair for pair in found if pair[0] <= radius_km][:limit]
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "city": row.city,
+            "state": row.state,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "distance_km": round(distance, 3),
+            "num_upcoming_shows": row.num_upcoming_shows,
+        }
+        for distance, row in found
+    ]
@@ -0,0 +1,76 @@
+# ----------------------------------------------------------------------------#
+# iCalendar feeds.
+# ----------------------------------------------------------------------------#
+# Show times are local wall-clock times without a zone, so they are written
+# as floating times that calendars display as given.
+LOCAL = "%Y%m%dT%H%M%S"
+UTC = "%Y%m%dT%H%M%SZ"
+
+
+def escape(text):
+    # A bare CR would end the content line, so every line break becomes \n.
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\r", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """Splits a content line into lines of at most 75 octets (RFC 5545 3.1)."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    start, limit = 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never split a UTF-8 sequence: back off continuation bytes.
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74  # Continuation lines start with a space.
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def event(show, url):
+    location = ", ".join(part for part in (show.address, show.city, show.state) if part)
+    return "".join(
+        fold(line)
+        for line in (
+            "BEGIN:VEVENT",
+            f"UID:show-{show.id}@fyyur",
+            f"DTSTAMP:{show.updated_at.strftime(UTC)}",
+            f"DTSTART:{show.start_time.strftime(LOCAL)}",
+            f"DTEND:{show.end_time.strftime(LOCAL)}",
+            f"SUMMARY:{escape(f'{show.artist_name} at {show.venue_name}')}",
+            f"LOCATION:{escape(location)}",
+            f"URL:{url}",
+            "END:VEVENT",
+        )
+    )
+
+
+def feed(name, shows, url, batch=50):
+    """Yields the calendar in chunks of batch events as shows are fetched."""
+    yield "".join(
+        fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Fyyur//Shows//EN",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{escape(name)}",
+        )
+    )
+    chunk = []
+    for show in shows:
+        chunk.append(event(show, url))
+        if len(chunk) == batch:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append(fold("END:VCALENDAR"))
+    yield "".join(chunk)
@@ -0,0 +1,145 @@
+# ----------------------------------------------------------------------------#
+# Prometheus metrics.
+# ----------------------------------------------------------------------------#
+import hmac
+import os
+import time
+
+from flask import Blueprint, Response, abort, current_app, g, has_request_context
+from flask import before_render_template, request, template_rendered
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.pool import QueuePool
+
+from cache import cache_lookup
+from statements import statement_timed, time_statements
+
+# With PROMETHEUS_MULTIPROC_DIR set (gunicorn), every worker writes its
+# samples to files in that directory and /metrics aggregates them. Clear the
+# directory before starting the server and call
+# prometheus_client.multiprocess.mark_process_dead(worker.pid) from
+# gunicorn's child_exit hook.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_SECONDS = Histogram(
+    "fyyur_request_duration_seconds",
+    "Time spent handling a request.",
+    ["endpoint", "method", "status"],
+)
+DB_SECONDS = Histogram(
+    "fyyur_request_db_seconds",
+    "Time a request spent running SQL statements.",
+    ["endpoint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+TEMPLATE_SECONDS = Histogram(
+    "fyyur_template_render_seconds", "Time spent rendering a template.", ["template"]
+)
+POOL_WAIT_SECONDS = Histogram(
+    "fyyur_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+CACHE_LOOKUPS = Counter(
+    "fyyur_cache_lookups_total", "Data cache lookups.", ["namespace", "result"]
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+class Metrics:
+    """Records request, database, template and cache metrics for /metrics.
+
+    Must be initialized before any engine is created so that the pool
+    options pick up TimedQueuePool.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config["METRICS"]:
+            return
+        options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+        if "pool_size" in options:
+            options.setdefault("poolclass", TimedQueuePool)
+        app.before_request(start_request)
+        app.after_request(observe_request)
+        before_render_template.connect(start_render, app)
+        template_rendered.connect(observe_render, app)
+        cache_lookup.connect(count_lookup)
+        time_statements()
+        statement_timed.connect(observe_statement)
+        app.register_blueprint(blueprint)
+        app.extensions["metrics"] = self
+
+
+def start_request():
+    g.metrics = {"started": time.perf_counter(), "db": 0.0, "renders": []}
+
+
+def observe_request(response):
+    state = g.pop("metrics", None)
+    if state is None:
+        return response
+    endpoint = request.endpoint or "unmatched"
+    REQUEST_SECONDS.labels(endpoint, request.method, response.status_code).observe(
+        time.perf_counter() - state["started"]
+    )
+    DB_SECONDS.labels(endpoint).observe(state["db"])
+    return response
+
+
+def start_render(sender, template, context, **extra):
+    if "metrics" in g:
+        g.metrics["renders"].append(time.perf_counter())
+
+
+def observe_render(sender, template, context, **extra):
+    if "metrics" in g and g.metrics["renders"]:
+        TEMPLATE_SECONDS.labels(template.name).observe(
+            time.perf_counter() - g.metrics["renders"].pop()
+        )
+
+
+def count_lookup(sender, namespace, hit):
+    CACHE_LOOKUPS.labels(namespace, "hit" if hit else "miss").inc()
+
+
+def observe_statement(sender, statement, seconds):
+    if has_request_context() and "metrics" in g:
+        g.metrics["db"] += seconds
+
+
+blueprint = Blueprint("metrics", __name__)
+
+
+@blueprint.route("/metrics")
+def scrape():
+    token = current_app.config["METRICS_TOKEN"]
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        abort(401)
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
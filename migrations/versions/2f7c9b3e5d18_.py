@@ -0,0 +1,44 @@
+"""delete shows with their venue or artist
+
+Revision ID: 2f7c9b3e5d18
+Revises: 6a2d8e4b1c97
+Create Date: 2026-10-17 09:41:03.226915
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2f7c9b3e5d18"
+down_revision = "6a2d8e4b1c97"
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = (("venue_id", "Venue"), ("artist_id", "Artist"))
+# PostgreSQL names foreign keys "<table>_<column>_fkey". SQLite always
+# reflects them nameless and batch mode names them with this convention.
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"
+}
+
+
+def replace_foreign_keys(ondelete):
+    if op.get_bind().dialect.name == "postgresql":
+        current = lambda key, parent: f"Show_{key}_fkey"
+    else:
+        current = lambda key, parent: f"fk_Show_{key}_{parent}"
+    with op.batch_alter_table("Show", naming_convention=NAMING_CONVENTION) as batch_op:
+        for key, parent in FOREIGN_KEYS:
+            batch_op.drop_constraint(current(key, parent), type_="foreignkey")
+            batch_op.create_foreign_key(
+                f"Show_{key}_fkey", parent, [key], ["id"], ondelete=ondelete
+            )
+
+
+def upgrade():
+    replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    replace_foreign_keys(None)
@@ -0,0 +1,45 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: 3b1f0c7d9a24
+Revises: 7e940c010711
+Create Date: 2026-10-16 10:12:41.118230
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b1f0c7d9a24"
+down_revision = "7e940c010711"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm GIN indexes serve name ILIKE '%term%' and similarity() ranking,
+    # other dialects fall back to a scan.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_Venue_name_trgm",
+        "Venue",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_Artist_name_trgm",
+        "Artist",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_Artist_name_trgm", table_name="Artist")
+    op.drop_index("ix_Venue_name_trgm", table_name="Venue")
@@ -0,0 +1,76 @@
+"""show end times and no overlapping bookings
+
+Revision ID: 6a2d8e4b1c97
+Revises: 9d3e6a1f8c05
+Create Date: 2026-10-16 23:05:17.530481
+
+"""
+
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6a2d8e4b1c97"
+down_revision = "9d3e6a1f8c05"
+branch_labels = None
+depends_on = None
+
+# Length given to the shows booked before end times existed.
+DEFAULT_MINUTES = 120
+OWNERS = ("venue_id", "artist_id")
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.add_column("Show", sa.Column("end_time", sa.DateTime(), nullable=True))
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            'UPDATE "Show" SET end_time = start_time + '
+            f"interval '{DEFAULT_MINUTES} minutes'"
+        )
+    else:
+        # Computed in Python so that the values keep SQLAlchemy's storage
+        # format on SQLite, which has no datetime type.
+        show = sa.table(
+            "Show",
+            sa.column("id", sa.Integer),
+            sa.column("start_time", sa.DateTime),
+            sa.column("end_time", sa.DateTime),
+        )
+        rows = [
+            {
+                "show_id": row.id,
+                "end_time": row.start_time + timedelta(minutes=DEFAULT_MINUTES),
+            }
+            for row in bind.execute(sa.select(show.c.id, show.c.start_time))
+        ]
+        if rows:
+            bind.execute(
+                show.update()
+                .where(show.c.id == sa.bindparam("show_id"))
+                .values(end_time=sa.bindparam("end_time")),
+                rows,
+            )
+    with op.batch_alter_table("Show") as batch_op:
+        batch_op.alter_column("end_time", existing_type=sa.DateTime(), nullable=False)
+    if bind.dialect.name != "postgresql":
+        return
+    # The database itself refuses two shows overlapping at one venue or for one
+    # artist, including ones committed concurrently. This fails if existing
+    # shows already overlap; move or shorten them first.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    for key in OWNERS:
+        op.execute(
+            f'ALTER TABLE "Show" ADD CONSTRAINT "Show_{key}_no_overlap" '
+            f"EXCLUDE USING gist ({key} WITH =, tsrange(start_time, end_time) WITH &&)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for key in OWNERS:
+            op.drop_constraint(f"Show_{key}_no_overlap", "Show")
+    with op.batch_alter_table("Show") as batch_op:
+        batch_op.drop_column("end_time")
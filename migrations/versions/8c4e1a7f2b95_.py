@@ -0,0 +1,40 @@
+"""venue coordinates for nearby searches
+
+Revision ID: 8c4e1a7f2b95
+Revises: 2f7c9b3e5d18
+Create Date: 2026-10-17 14:12:48.903512
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8c4e1a7f2b95"
+down_revision = "2f7c9b3e5d18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("Venue", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("Venue", sa.Column("longitude", sa.Float(), nullable=True))
+    # Bounding box prefilter on other dialects, declared on the model.
+    op.create_index("ix_Venue_latitude_longitude", "Venue", ["latitude", "longitude"])
+    if op.get_bind().dialect.name == "postgresql":
+        # Radius searches with earth_box() @> ll_to_earth(), see geo.nearby.
+        op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+        op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+        op.execute(
+            'CREATE INDEX "ix_Venue_earth" ON "Venue" '
+            "USING gist (ll_to_earth(latitude, longitude))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_Venue_earth", table_name="Venue")
+    op.drop_index("ix_Venue_latitude_longitude", table_name="Venue")
+    with op.batch_alter_table("Venue") as batch_op:
+        batch_op.drop_column("longitude")
+        batch_op.drop_column("latitude")
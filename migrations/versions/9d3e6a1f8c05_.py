@@ -0,0 +1,55 @@
+"""denormalized upcoming/past show counters on Venue and Artist
+
+Revision ID: 9d3e6a1f8c05
+Revises: 5e27b9d4c610
+Create Date: 2026-10-16 15:21:48.902716
+
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9d3e6a1f8c05"
+down_revision = "5e27b9d4c610"
+branch_labels = None
+depends_on = None
+
+OWNERS = (("Venue", "venue_id"), ("Artist", "artist_id"))
+
+
+def upgrade():
+    for table, key in OWNERS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(
+                sa.Column(
+                    "upcoming_shows_count",
+                    sa.Integer(),
+                    server_default="0",
+                    nullable=False,
+                )
+            )
+            batch_op.add_column(
+                sa.Column(
+                    "past_shows_count", sa.Integer(), server_default="0", nullable=False
+                )
+            )
+        # Backfill from the live aggregates.
+        op.get_bind().execute(
+            sa.text(
+                f'UPDATE "{table}" SET '
+                f'upcoming_shows_count = (SELECT count(*) FROM "Show" '
+                f'WHERE "Show".{key} = "{table}".id AND "Show".start_time >= :now), '
+                f'past_shows_count = (SELECT count(*) FROM "Show" '
+                f'WHERE "Show".{key} = "{table}".id AND "Show".start_time < :now)'
+            ).bindparams(now=datetime.now())
+        )
+
+
+def downgrade():
+    for table, _ in OWNERS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("past_shows_count")
+            batch_op.drop_column("upcoming_shows_count")
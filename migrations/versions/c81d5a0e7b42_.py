@@ -0,0 +1,105 @@
+"""normalize venue and artist genres into a Genre table
+
+Revision ID: c81d5a0e7b42
+Revises: a4c92e6f1d37
+Create Date: 2026-10-16 11:35:27.640918
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c81d5a0e7b42"
+down_revision = "a4c92e6f1d37"
+branch_labels = None
+depends_on = None
+
+# (owner table, association table, owner key) for both entities with genres.
+OWNERS = (("Venue", "VenueGenre", "venue_id"), ("Artist", "ArtistGenre", "artist_id"))
+
+
+def parse_genres(value):
+    # Genres were stored as a Postgres array literal, e.g. {Jazz,"Rock n Roll"}.
+    return [
+        name
+        for name in value.translate({ord(i): None for i in '{"}'}).split(",")
+        if name
+    ]
+
+
+def upgrade():
+    genre = op.create_table(
+        "Genre",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    for owner, association, key in OWNERS:
+        op.create_table(
+            association,
+            sa.Column(key, sa.Integer(), nullable=False),
+            sa.Column("genre_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint([key], [f"{owner}.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["genre_id"], ["Genre.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint(key, "genre_id"),
+        )
+        op.create_index(
+            f"ix_{association}_genre_id", association, ["genre_id"], unique=False
+        )
+
+    connection = op.get_bind()
+    genre_ids = {}
+    for owner, association, key in OWNERS:
+        owner_table = sa.table(owner, sa.column("id"), sa.column("genres"))
+        rows = []
+        for owner_id, genres in connection.execute(
+            sa.select(owner_table.c.id, owner_table.c.genres)
+        ):
+            for name in parse_genres(genres):
+                if name not in genre_ids:
+                    genre_ids[name] = connection.execute(
+                        genre.insert().values(name=name)
+                    ).inserted_primary_key[0]
+                rows.append({key: owner_id, "genre_id": genre_ids[name]})
+        if rows:
+            association_table = sa.table(
+                association, sa.column(key), sa.column("genre_id")
+            )
+            connection.execute(association_table.insert(), rows)
+
+    with op.batch_alter_table("Venue") as batch_op:
+        batch_op.drop_column("genres")
+    with op.batch_alter_table("Artist") as batch_op:
+        batch_op.drop_column("genres")
+
+
+def downgrade():
+    connection = op.get_bind()
+    for owner, association, key in OWNERS:
+        with op.batch_alter_table(owner) as batch_op:
+            batch_op.add_column(
+                sa.Column(
+                    "genres", sa.String(length=120), nullable=False, server_default="{}"
+                )
+            )
+        owner_table = sa.table(owner, sa.column("id"), sa.column("genres"))
+        association_table = sa.table(association, sa.column(key), sa.column("genre_id"))
+        genre = sa.table("Genre", sa.column("id"), sa.column("name"))
+        genres = {}
+        for owner_id, name in connection.execute(
+            sa.select(association_table.c[key], genre.c.name)
+            .join(genre, genre.c.id == association_table.c.genre_id)
+            .order_by(association_table.c[key], genre.c.name)
+        ):
+            genres.setdefault(owner_id, []).append(name)
+        for owner_id, names in genres.items():
+            connection.execute(
+                owner_table.update()
+                .where(owner_table.c.id == owner_id)
+                .values(genres="{" + ",".join(f'"{name}"' for name in names) + "}")
+            )
+        op.drop_index(f"ix_{association}_genre_id", table_name=association)
+        op.drop_table(association)
+    op.drop_table("Genre")
@@ -0,0 +1,25 @@
+"""show start time index for time windows
+
+Revision ID: d5b3f8e2a610
+Revises: 8c4e1a7f2b95
+Create Date: 2026-10-17 18:37:22.641079
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d5b3f8e2a610"
+down_revision = "8c4e1a7f2b95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves date windows and the (start_time, id) keyset order of /shows.
+    op.create_index("ix_Show_start_time_id", "Show", ["start_time", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_Show_start_time_id", table_name="Show")
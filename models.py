@@ -1,15 +1,75 @@
 # ----------------------------------------------------------------------------#
 # Models.
 # ----------------------------------------------------------------------------#
-from flask_sqlalchemy import SQLAlchemy
-from flask import Flask
+from datetime import datetime
 
-app = Flask(__name__)
-db = SQLAlchemy(app)
+from sqlalchemy import DDL, event, inspect
+
+from routing import RoutingSQLAlchemy, RoutingSession
+
+db = RoutingSQLAlchemy()
+
+
+venue_genres = db.Table(
+    "VenueGenre",
+    db.Column(
+        "venue_id",
+        db.Integer,
+        db.ForeignKey("Venue.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    db.Column(
+        "genre_id",
+        db.Integer,
+        db.ForeignKey("Genre.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    ),
+)
+
+artist_genres = db.Table(
+    "ArtistGenre",
+    db.Column(
+        "artist_id",
+        db.Integer,
+        db.ForeignKey("Artist.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    db.Column(
+        "genre_id",
+        db.Integer,
+        db.ForeignKey("Genre.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    ),
+)
+
+
+class Genre(db.Model):
+    __tablename__ = "Genre"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+    @classmethod
+    def from_names(cls, names):
+        """Returns the Genre rows for names, adding the ones not stored yet."""
+        names = list(dict.fromkeys(names))
+        genres = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+        for name in names:
+            if name not in genres:
+                genres[name] = cls(name=name)
+                db.session.add(genres[name])
+        return [genres[name] for name in names]
 
 
 class Venue(db.Model):
     __tablename__ = "Venue"
+    __table_args__ = (
+        db.Index("ix_Venue_city_state", "city", "state"),
+        # The bounding box prefilter of geo.nearby, see migration 8c4e1a7f2b95.
+        db.Index("ix_Venue_latitude_longitude", "latitude", "longitude"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(70), nullable=False)
@@ -17,13 +77,47 @@ class Venue(db.Model):
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship(
+        "Genre", secondary=venue_genres, lazy="selectin", order_by="Genre.name"
+    )
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, server_default="f", default=False)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship("Show", backref="venue")
+    # Filled in by `flask geocode` and indexed for nearby searches, see geo.py.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # Denormalized, maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        server_default=db.func.now(),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+    # The database deletes the shows, see deletes.py.
+    shows = db.relationship(
+        "Show", backref="venue", cascade="all, delete", passive_deletes=True
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# The earthdistance index geo.nearby uses on PostgreSQL, which an Index()
+# cannot declare portably.
+for statement in (
+    "CREATE EXTENSION IF NOT EXISTS cube",
+    "CREATE EXTENSION IF NOT EXISTS earthdistance",
+    'CREATE INDEX "ix_Venue_earth" ON "Venue" '
+    "USING gist (ll_to_earth(latitude, longitude))",
+):
+    event.listen(
+        Venue.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
 
 
 class Artist(db.Model):
@@ -34,18 +128,79 @@ class Artist(db.Model):
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship(
+        "Genre", secondary=artist_genres, lazy="selectin", order_by="Genre.name"
+    )
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, server_default="f", default=False)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship("Show", backref="artist")
+    # Denormalized, maintained by counters.py.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default="0")
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        server_default=db.func.now(),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+    # The database deletes the shows, see deletes.py.
+    shows = db.relationship(
+        "Show", backref="artist", cascade="all, delete", passive_deletes=True
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def touch_regenred(session, flush_context, instances):
+    # Genre links live in VenueGenre/ArtistGenre, so a genre-only edit would
+    # not UPDATE the owner: touch it so that its version (and ETag) moves.
+    for instance in session.dirty:
+        if (
+            isinstance(instance, (Venue, Artist))
+            and inspect(instance).attrs.genres.history.has_changes()
+        ):
+            instance.updated_at = datetime.utcnow()
+
+
+def is_upcoming(start_time, now):
+    """Whether a show starting at start_time is upcoming at now.
+
+    The one definition used by the counters, the page versions and the
+    past/upcoming split; start_time may be a datetime or Show.start_time.
+    """
+    return start_time >= now
 
 
 class Show(db.Model):
     __tablename__ = "Show"
+    __table_args__ = (
+        db.Index("ix_Show_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_Show_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_Show_start_time_id", "start_time", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False)
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), nullable=False
+    )
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("Artist.id", ondelete="CASCADE"), nullable=False
+    )
     start_time = db.Column(db.DateTime, nullable=False)
+    # Booked until; see booking.py for the overlap rules.
+    end_time = db.Column(db.DateTime, nullable=False)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        server_default=db.func.now(),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
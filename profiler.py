@@ -0,0 +1,93 @@
+# ----------------------------------------------------------------------------#
+# Per-request query profiling.
+# ----------------------------------------------------------------------------#
+import re
+from collections import Counter, deque
+
+from flask import current_app, g, has_request_context, request
+
+from statements import statement_timed, time_statements
+
+# Literals and bind parameters, replaced by "?" so that statements differing
+# only in their values share a shape.
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|\$\d+|:\w+|\?")
+# "IN (?, ?, ?)" and multi-row "VALUES (?, ?), (?, ?)" of any length.
+LISTS = re.compile(r"\(\?(?:,\s*\?)*\)(?:,\s*\(\?(?:,\s*\?)*\))*")
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised in testing mode when a request repeats a statement too often."""
+
+
+def shape(statement):
+    statement = LITERALS.sub("?", " ".join(statement.split()))
+    return LISTS.sub("(...)", statement)
+
+
+class QueryProfiler:
+    """Counts and times the statements run by each request.
+
+    Every response gets X-Query-Count and Server-Timing headers. A request
+    running the same statement shape more than QUERY_REPEAT_THRESHOLD times
+    (an N+1 pattern) is logged, or fails outright in testing mode. The last
+    requests are kept for /debug/queries.
+    """
+
+    def __init__(self, app=None):
+        self.recent = deque(maxlen=50)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config["QUERY_PROFILER"]:
+            return
+        app.extensions["profiler"] = self
+        app.before_request(self.start)
+        app.after_request(self.report)
+        time_statements()
+        statement_timed.connect(record_statement)
+
+    def start(self):
+        g.queries = {"count": 0, "seconds": 0.0, "shapes": Counter(), "warned": set()}
+
+    def report(self, response):
+        profile = g.pop("queries", None)
+        if profile is None:
+            return response
+        milliseconds = profile["seconds"] * 1000
+        response.headers["X-Query-Count"] = str(profile["count"])
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={milliseconds:.1f};desc="{profile["count"]} queries"',
+        )
+        self.recent.append(
+            {
+                "method": request.method,
+                "path": request.full_path.rstrip("?"),
+                "status": response.status_code,
+                "count": profile["count"],
+                "milliseconds": round(milliseconds, 1),
+                "top": profile["shapes"].most_common(5),
+            }
+        )
+        return response
+
+
+def record_statement(sender, statement, seconds):
+    if not (has_request_context() and "queries" in g):
+        return
+    profile = g.queries
+    profile["seconds"] += seconds
+    profile["count"] += 1
+    key = shape(statement)
+    profile["shapes"][key] += 1
+    threshold = current_app.config["QUERY_REPEAT_THRESHOLD"]
+    if profile["shapes"][key] > threshold and key not in profile["warned"]:
+        profile["warned"].add(key)
+        message = (
+            f"{request.method} {request.path} ran this statement more than "
+            f"{threshold} times, likely an N+1 query: {key}"
+        )
+        if current_app.testing:
+            raise RepeatedQueryError(message)
+        current_app.logger.warning(message)
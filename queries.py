@@ -0,0 +1,356 @@
+# ----------------------------------------------------------------------------#
+# Queries.
+# ----------------------------------------------------------------------------#
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import joinedload
+
+from geo import place_key, place_name
+from models import db, Venue, Artist, Show, Genre, is_upcoming
+
+
+def upcoming_count(now):
+    # Conditional aggregate over an outer join, counts 0 for venues without shows.
+    return func.coalesce(
+        func.sum(case((is_upcoming(Show.start_time, now), 1), else_=0)), 0
+    )
+
+
+def venue_areas(genre=None):
+    """Builds the area -> venues -> upcoming show count tree in one statement.
+
+    Upcoming counts come from the counters maintained by counters.py.
+    """
+    query = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count.label("num_upcoming_shows"),
+    )
+    if genre:
+        query = query.filter(Venue.genres.any(Genre.name == genre))
+    # Grouped on the normalized place, so that "new york " and "New York" are
+    # one area, shown as spelled by its first venue.
+    rows = sorted(query, key=lambda row: (place_key(row.city, row.state), row.id))
+    areas = []
+    for _, venues in groupby(rows, key=lambda row: place_key(row.city, row.state)):
+        venues = list(venues)
+        areas.append(
+            {
+                "city": " ".join(venues[0].city.split()),
+                "state": " ".join(venues[0].state.split()),
+                "venues": [
+                    {
+                        "id": venue.id,
+                        "name": venue.name,
+                        "num_upcoming_shows": venue.num_upcoming_shows,
+                    }
+                    for venue in venues
+                ],
+            }
+        )
+    return areas
+
+
+def artist_list(genre=None):
+    query = db.session.query(Artist.id, Artist.name).order_by(Artist.id)
+    if genre:
+        query = query.filter(Artist.genres.any(Genre.name == genre))
+    return [{"id": artist.id, "name": artist.name} for artist in query]
+
+
+def entity_dict(entity):
+    data = {
+        column.key: getattr(entity, column.key) for column in entity.__table__.columns
+    }
+    data["genres"] = [genre.name for genre in entity.genres]
+    data["website"] = data.pop("website_link")  # Naming inconsistencies in templates.
+    return data
+
+
+def detail_dict(entity, shows):
+    """entity_dict() plus its shows, oldest first, as cached: which of them are
+    upcoming depends on the time of the request, see partition_shows()."""
+    data = entity_dict(entity)
+    data["shows"] = [
+        dict(show, start_time=start_time)
+        for start_time, show in sorted(shows, key=lambda pair: pair[0])
+    ]
+    return data
+
+
+def partition_shows(data, now):
+    """A copy of a detail_dict() with its shows split into past/upcoming
+    against a single `now`."""
+    data = dict(data)
+    shows = data.pop("shows")
+    data["past_shows"] = [
+        show for show in shows if not is_upcoming(show["start_time"], now)
+    ]
+    data["upcoming_shows"] = [
+        show for show in shows if is_upcoming(show["start_time"], now)
+    ]
+    data["past_shows_count"] = len(data["past_shows"])
+    data["upcoming_shows_count"] = len(data["upcoming_shows"])
+    return data
+
+
+def venue_detail(venue_id):
+    venue = (
+        Venue.query.options(
+            joinedload(Venue.shows).joinedload(Show.artist).lazyload(Artist.genres)
+        )
+        .filter(Venue.id == venue_id)
+        .first()
+    )
+    if venue is None:
+        return None
+    shows = [
+        (
+            show.start_time,
+            {
+                "artist_id": show.artist_id,
+                "artist_name": show.artist.name,
+                "artist_image_link": show.artist.image_link,
+            },
+        )
+        for show in venue.shows
+    ]
+    return detail_dict(venue, shows)
+
+
+def artist_detail(artist_id):
+    artist = (
+        Artist.query.options(
+            joinedload(Artist.shows).joinedload(Show.venue).lazyload(Venue.genres)
+        )
+        .filter(Artist.id == artist_id)
+        .first()
+    )
+    if artist is None:
+        return None
+    shows = [
+        (
+            show.start_time,
+            {
+                "venue_id": show.venue_id,
+                "venue_name": show.venue.name,
+                "venue_image_link": show.venue.image_link,
+            },
+        )
+        for show in artist.shows
+    ]
+    return detail_dict(artist, shows)
+
+
+def shows_page(per_page, after=None, genre=None, window=None, city=None):
+    """Keyset page of shows ordered by (start_time, id), one joined query.
+
+    window is a (start, end) pair of datetimes, either may be None, and city
+    matches case-insensitively. Returns the page and the cursor of its last
+    row when another page follows.
+    """
+    query = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label("venue_name"),
+            Show.artist_id,
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+    )
+    if genre:
+        query = query.filter(Artist.genres.any(Genre.name == genre))
+    if window is not None:
+        # A range scan on ix_Show_start_time_id, like the keyset condition.
+        start, end = window
+        if start is not None:
+            query = query.filter(Show.start_time >= start)
+        if end is not None:
+            query = query.filter(Show.start_time < end)
+    if city:
+        # The spellings of the city, picked by place_name() like venue_areas()
+        # groups them, from the distinct cities (an ix_Venue_city_state scan).
+        wanted = place_name(city)
+        spellings = [
+            name
+            for name in db.session.execute(select(Venue.city).distinct()).scalars()
+            if place_name(name) == wanted
+        ]
+        query = query.filter(Venue.city.in_(spellings))
+    if after is not None:
+        query = query.filter(tuple_(Show.start_time, Show.id) > tuple_(*after))
+    rows = query.order_by(Show.start_time, Show.id).limit(per_page + 1).all()
+    page = [
+        {
+            "venue_id": row.venue_id,
+            "venue_name": row.venue_name,
+            "artist_id": row.artist_id,
+            "artist_name": row.artist_name,
+            "artist_image_link": row.artist_image_link,
+            "start_time": row.start_time,
+        }
+        for row in rows[:per_page]
+    ]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        next_cursor = encode_cursor(last.start_time, last.id)
+    return page, next_cursor
+
+
+def encode_cursor(start_time, show_id):
+    return f"{start_time.isoformat()}_{show_id}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor, raises ValueError on malformed input."""
+    start_time, _, show_id = cursor.rpartition("_")
+    return datetime.fromisoformat(start_time), int(show_id)
+
+
+def parse_window(start, end):
+    """?from= and ?to= values as a (start, end) window of shows.
+
+    Both are ISO dates or datetimes and may be empty. A date-only end takes
+    in that whole day. Raises ValueError on malformed or reversed values.
+    """
+    window = []
+    for value, whole_day in ((start, False), (end, True)):
+        if not value:
+            window.append(None)
+            continue
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            raise ValueError("Show times are local, without a UTC offset")
+        if whole_day and len(value) == 10:
+            moment += timedelta(days=1)
+        window.append(moment)
+    if None not in window and window[0] >= window[1]:
+        raise ValueError("The window ends before it starts")
+    return tuple(window)
+
+
+def show_feed(key, entity_id, since, batch_size=500):
+    """Shows of a venue or artist starting after since, for calendar feeds.
+
+    Rows are fetched batch_size at a time (a server-side cursor on
+    PostgreSQL) so that a long feed is never loaded at once.
+    """
+    return (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.end_time,
+            Show.updated_at,
+            Venue.name.label("venue_name"),
+            Venue.address,
+            Venue.city,
+            Venue.state,
+            Artist.name.label("artist_name"),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .filter(key == entity_id, Show.start_time >= since)
+        .order_by(Show.start_time, Show.id)
+        .yield_per(batch_size)
+    )
+
+
+def last_started(now):
+    # Start of the latest show that has started: the page changed then, as the
+    # show moved from upcoming to past, so Last-Modified must not be older.
+    return func.max(case((~is_upcoming(Show.start_time, now), Show.start_time))).label(
+        "last_started"
+    )
+
+
+def venue_version_statement(venue_id, now):
+    return (
+        select(
+            Venue.version,
+            Venue.updated_at,
+            func.count(Show.id),
+            func.max(Show.updated_at),
+            func.max(Artist.updated_at),
+            last_started(now),
+            upcoming_count(now),
+        )
+        .outerjoin(Show, Show.venue_id == Venue.id)
+        .outerjoin(Artist, Show.artist_id == Artist.id)
+        .where(Venue.id == venue_id)
+        .group_by(Venue.id)
+    )
+
+
+def venue_version(venue_id, now):
+    """Everything the venue page depends on, or None for an unknown venue."""
+    return db.session.execute(venue_version_statement(venue_id, now)).first()
+
+
+def artist_version_statement(artist_id, now):
+    return (
+        select(
+            Artist.version,
+            Artist.updated_at,
+            func.count(Show.id),
+            func.max(Show.updated_at),
+            func.max(Venue.updated_at),
+            last_started(now),
+            upcoming_count(now),
+        )
+        .outerjoin(Show, Show.artist_id == Artist.id)
+        .outerjoin(Venue, Show.venue_id == Venue.id)
+        .where(Artist.id == artist_id)
+        .group_by(Artist.id)
+    )
+
+
+def artist_version(artist_id, now):
+    """Everything the artist page depends on, or None for an unknown artist."""
+    return db.session.execute(artist_version_statement(artist_id, now)).first()
+
+
+def listing_version(*models, upcoming_after=None):
+    """Row count and last update of each model's table, as one statement."""
+    columns = []
+    for model in models:
+        name = model.__tablename__.lower()
+        columns.append(
+            select(func.count(model.id)).scalar_subquery().label(f"{name}_count")
+        )
+        columns.append(
+            select(func.max(model.updated_at))
+            .scalar_subquery()
+            .label(f"{name}_updated_at")
+        )
+    if upcoming_after is not None:
+        columns.append(
+            select(func.count(Show.id))
+            .where(is_upcoming(Show.start_time, upcoming_after))
+            .scalar_subquery()
+            .label("upcoming_count")
+        )
+        columns.append(
+            select(last_started(upcoming_after)).scalar_subquery().label("last_started")
+        )
+    return db.session.query(*columns).one()
+
+
+def column_page(model, fields, limit, after=None):
+    """Keyset page of model rows by id, selecting only the requested columns."""
+    columns = [model.id] + [getattr(model, field) for field in fields if field != "id"]
+    query = db.session.query(*columns).order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.limit(limit + 1).all()
+    page = [{field: getattr(row, field) for field in fields} for row in rows[:limit]]
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return page, next_cursor
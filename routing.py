@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------#
+# Read replica routing.
+# ----------------------------------------------------------------------------#
+import itertools
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, event, orm, text
+
+STICKY_COOKIE = "primary_until"
+
+
+class RoutingSession(SignallingSession):
+    """Sends reads of views marked read_only to the replica picked for the request."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context() and g.get("replica") is not None:
+            return g.replica
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class Replicas:
+    """Round-robin over the configured replicas, skipping unhealthy ones.
+
+    A replica is pinged at most once per REPLICA_HEALTH_INTERVAL seconds and
+    benched for that long when the ping fails. With no healthy replica reads
+    go to the primary.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+        self.engines = [
+            create_engine(uri, **options)
+            for uri in app.config["SQLALCHEMY_REPLICA_URIS"]
+        ]
+        self.cycle = itertools.cycle(self.engines)
+        self.checked_at = {}
+        self.unhealthy_until = {}
+        app.extensions["replicas"] = self
+        app.after_request(set_sticky_cookie)
+
+    def healthy(self, engine):
+        now = time.monotonic()
+        if self.unhealthy_until.get(engine, 0) > now:
+            return False
+        interval = current_app.config["REPLICA_HEALTH_INTERVAL"]
+        if now - self.checked_at.get(engine, -interval) >= interval:
+            self.checked_at[engine] = now
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception:
+                current_app.logger.warning("Replica %s is unreachable", engine.url)
+                self.unhealthy_until[engine] = now + interval
+                return False
+        return True
+
+    def choose(self):
+        for _ in range(len(self.engines)):
+            engine = next(self.cycle)
+            if self.healthy(engine):
+                return engine
+        return None
+
+
+def read_only(view):
+    """Marks a view as safe to serve from a replica.
+
+    Clients that wrote within REPLICA_STICKY_SECONDS keep reading from the
+    primary so they see their own writes.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get("replicas")
+        sticky_until = request.cookies.get(STICKY_COOKIE, 0, type=float)
+        if replicas is not None and sticky_until < time.time():
+            g.replica = replicas.choose()
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def primary():
+    """Sends the reads inside the block to the primary, replica or not."""
+    replica = g.pop("replica", None) if has_app_context() else None
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g.replica = replica
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def mark_write(session):
+    if has_app_context():
+        g.wrote = True
+
+
+def set_sticky_cookie(response):
+    if g.get("wrote"):
+        seconds = current_app.config["REPLICA_STICKY_SECONDS"]
+        response.set_cookie(
+            STICKY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True
+        )
+    return response
@@ -0,0 +1,56 @@
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+from sqlalchemy import case, desc, func
+
+from models import db
+
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def rank(model, term):
+    if db.engine.dialect.name == "postgresql":
+        # Served by the pg_trgm GIN index on name, see migration 3b1f0c7d9a24.
+        return func.similarity(model.name, term)
+    # Portable ranking for other dialects (SQLite in development): exact match,
+    # then prefix match, then any other substring match.
+    name = func.lower(model.name)
+    return case(
+        (name == term.lower(), 2),
+        (name.like(escape_like(term.lower()) + "%", escape="\\"), 1),
+        else_=0,
+    )
+
+
+def search(model, term, limit, offset=0):
+    """Ranked name search over Venue or Artist.
+
+    Returns the total number of matches and one page of results with their
+    upcoming show counts, all from a single statement.
+    """
+    rows = (
+        db.session.query(
+            model.id,
+            model.name,
+            model.upcoming_shows_count.label("num_upcoming_shows"),
+            func.count().over().label("total"),
+        )
+        .filter(model.name.ilike(f"%{escape_like(term)}%", escape="\\"))
+        .order_by(desc(rank(model, term)), model.name, model.id)
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return {
+        "count": rows[0].total if rows else 0,
+        "data": [
+            {
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": row.num_upcoming_shows,
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,30 @@
+# ----------------------------------------------------------------------------#
+# Statement timing, shared by the query profiler and the metrics.
+# ----------------------------------------------------------------------------#
+import time
+
+from flask.signals import Namespace
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Sent after every statement, with statement (its SQL) and seconds.
+statement_timed = Namespace().signal("statement-timed")
+
+
+def time_statements():
+    """Times the statements of every engine, once however often it is called."""
+    if not event.contains(Engine, "before_cursor_execute", start_statement):
+        event.listen(Engine, "before_cursor_execute", start_statement)
+        event.listen(Engine, "after_cursor_execute", finish_statement)
+
+
+def start_statement(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context rather than the connection, so that a failed
+    # statement leaves nothing behind for the next one.
+    context._started = time.perf_counter()
+
+
+def finish_statement(conn, cursor, statement, parameters, context, executemany):
+    statement_timed.send(
+        conn, statement=statement, seconds=time.perf_counter() - context._started
+    )
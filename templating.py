@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------------#
+# Jinja fragment cache and bytecode cache.
+# ----------------------------------------------------------------------------#
+import click
+from flask import current_app, g, request
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import cache
+
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache name[, ttl] %}...{% endcache %}.
+
+    The rendered block is stored in the data cache under the page's URL and
+    the ETag @conditional computed for it, so any change to what the page
+    shows renders it anew. Use it for whole sections rather than for each
+    item in them. Blocks of pages without an ETag are not cached.
+
+    A block must only show what the ETag covers, computed for this request:
+    the show sections split the cached shows per request (partition_shows)
+    so that a show passing its start time moves the ETag and the section
+    together.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, name, ttl, caller):
+        if "etag" not in g:
+            return caller()
+        key = f"{request.full_path.rstrip('?')}:{g.etag}:{name}"
+        return Markup(cache.get_or_set_fragment(key, lambda: str(caller()), ttl))
+
+
+def init_templates(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config["TEMPLATE_BYTECODE_CACHE"]:
+        # Compiled templates are shared by every worker and survive restarts.
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            app.config["TEMPLATE_BYTECODE_DIR"]
+        )
+
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates_command():
+    """Fills the bytecode cache with every template, e.g. at deploy time."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.ClickException("TEMPLATE_BYTECODE_CACHE is off.")
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    click.echo(f"Compiled {len(names)} templates.")
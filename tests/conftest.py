@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# app.py builds an app on import from config.py, which reads the environment
+# once: set it up, with a throwaway SQLite database, before importing them.
+DATABASE = os.path.join(tempfile.mkdtemp(), "fyyur-test.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DATABASE
+os.environ["SECRET_KEY"] = "test"
+# Debug mode also turns on the query profiler, which fails N+1 requests in tests.
+os.environ["FLASK_DEBUG"] = "true"
+os.environ.setdefault("CACHE_TYPE", "null")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from cache import LRUCache, cache
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """Statements run on the engine, cleared with statements.clear()."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def cached(app):
+    """Turns the data cache on, as CACHE_TYPE=simple would."""
+    backend = cache.backend
+    cache.backend = LRUCache(1024, 3600)
+    yield cache.backend
+    cache.backend = backend
+
+
+def later(hours):
+    """A datetime class whose now() is hours ahead, to patch into modules."""
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(hours=hours)
+
+    return Later
+
+
+def seed(venues, artists=2, shows_per_venue=2, cities=3):
+    """Adds venues spread over cities, each with past and upcoming shows."""
+    now = datetime.now().replace(microsecond=0)
+    performers = [
+        Artist(name=f"Artist {index}", city="Austin", state="TX")
+        for index in range(artists)
+    ]
+    places = [
+        Venue(
+            name=f"Venue {index}",
+            city=f"City {index % cities}",
+            state="TX",
+            address=f"{index} Main St",
+        )
+        for index in range(venues)
+    ]
+    db.session.add_all(performers + places)
+    db.session.flush()
+    for index, venue in enumerate(places):
+        for number in range(shows_per_venue):
+            # Alternately past and upcoming, an hour apart so none overlap.
+            start_time = now + timedelta(
+                days=(index + 1) * (-1) ** number, hours=number
+            )
+            db.session.add(
+                Show(
+                    venue_id=venue.id,
+                    artist_id=performers[number % artists].id,
+                    start_time=start_time,
+                    end_time=start_time + timedelta(hours=1),
+                )
+            )
+    db.session.commit()
+    return places
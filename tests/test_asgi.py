@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from aio import AsyncApp
+from cache import LRUCache, cache
+from conftest import seed
+
+
+async def serve(application, path, headers=()):
+    """One GET through the ASGI application, returns (status, headers)."""
+    started = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started.update(message)
+
+    await application(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"localhost"), *headers],
+        },
+        receive,
+        send,
+    )
+    return started["status"], dict(started["headers"])
+
+
+def get(application, path, headers=()):
+    async def request():
+        try:
+            return await serve(application, path, headers)
+        finally:
+            await application.dispose()
+
+    return asyncio.run(request())
+
+
+def test_async_pages_match_the_sync_ones(app, client):
+    venue = seed(2)[0]
+    application = AsyncApp(app)
+    for path in (f"/venues/{venue.id}", f"/artists/{venue.shows[0].artist_id}"):
+        status, headers = get(application, path)
+        assert status == 200
+        assert headers[b"etag"].decode() == client.get(path).headers["ETag"]
+        status, _ = get(application, path, [(b"if-none-match", headers[b"etag"])])
+        assert status == 304
+    assert get(application, "/venues/999999")[0] == 404
+    # Other routes are served by the sync app.
+    assert get(application, "/venues")[0] == 200
+
+
+class SlowCache(LRUCache):
+    """A cache with a Redis round trip's worth of blocking on every get."""
+
+    def get(self, key):
+        time.sleep(0.2)
+        return super().get(key)
+
+
+def test_cache_and_rendering_leave_the_event_loop_free(app, monkeypatch):
+    first, second = seed(2)
+    monkeypatch.setattr(cache, "backend", SlowCache(1024, 3600))
+    application = AsyncApp(app)
+    gaps = []
+
+    async def heartbeat():
+        while True:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.01)
+            gaps.append(time.perf_counter() - tick)
+
+    async def requests():
+        beating = asyncio.create_task(heartbeat())
+        try:
+            return await asyncio.gather(
+                serve(application, f"/venues/{first.id}"),
+                serve(application, f"/venues/{second.id}"),
+            )
+        finally:
+            beating.cancel()
+            await application.dispose()
+
+    responses = asyncio.run(requests())
+    assert [status for status, _ in responses] == [200, 200]
+    assert gaps and max(gaps) < 0.15
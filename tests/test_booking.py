@@ -0,0 +1,89 @@
+import io
+
+from conftest import seed
+from models import db, Show
+
+
+def tour(venue_id, artist_id, *start_times):
+    return [
+        {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": start_time,
+            "duration": 90,
+        }
+        for start_time in start_times
+    ]
+
+
+def upload(client, rows, atomic=False, content=None):
+    if content is None:
+        lines = ["venue_id,artist_id,start_time,duration"]
+        lines += [",".join(str(value) for value in row.values()) for row in rows]
+        content = "\n".join(lines).encode()
+    data = {"schedule": (io.BytesIO(content), "tour.csv")}
+    if atomic:
+        data["atomic"] = "y"
+    response = client.post(
+        "/shows/batch", data=data, content_type="multipart/form-data"
+    )
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_tour_upload(client):
+    venue = seed(1)[0]
+    artist_id = venue.shows[0].artist_id
+    shows = db.session.query(Show).count()
+    rows = tour(venue.id, artist_id, "2031-05-01 20:00:00", "2031-05-02 20:00:00")
+    assert "2 shows listed, 0 rows rejected." in upload(client, rows)
+    assert db.session.query(Show).count() == shows + 2
+
+
+def test_overlapping_atomic_tour_upload_books_nothing(client):
+    venue = seed(1)[0]
+    artist_id = venue.shows[0].artist_id
+    shows = db.session.query(Show).count()
+    rows = tour(venue.id, artist_id, "2031-05-01 20:00:00", "2031-05-01 21:00:00")
+    page = upload(client, rows, atomic=True)
+    assert "Row 2: The slot is taken by row 1." in page
+    assert "0 shows listed, 1 rows rejected." in page
+    assert db.session.query(Show).count() == shows
+
+
+def test_malformed_tour_upload(client):
+    venue_id = seed(1)[0].id
+    shows = db.session.query(Show).count()
+    page = upload(client, [], content=b"venue_id,artist_id\n\xff\xfe,1\n")
+    assert "The schedule is not valid CSV or JSON Lines." in page
+    page = upload(client, [], content=f"venue_id\n{venue_id}\n".encode())
+    assert "Row 1: Venue and artist IDs must be numbers." in page
+    assert db.session.query(Show).count() == shows
+
+
+def test_tour_api(client):
+    venue = seed(1)[0]
+    artist_id = venue.shows[0].artist_id
+    shows = db.session.query(Show).count()
+    clean = tour(venue.id, artist_id, "2031-05-01 20:00:00", "2031-05-02 20:00:00")
+    response = client.post("/api/v1/shows/batch", json={"shows": clean})
+    assert response.status_code == 201
+    assert response.get_json() == {"booked": [1, 2], "errors": []}
+    overlapping = tour(
+        venue.id, artist_id, "2031-06-01 20:00:00", "2031-05-02 20:30:00"
+    )
+    response = client.post(
+        "/api/v1/shows/batch", json={"shows": overlapping, "atomic": True}
+    )
+    assert response.status_code == 422
+    assert response.get_json()["booked"] == []
+    assert response.get_json()["errors"][0]["row"] == 2
+    assert db.session.query(Show).count() == shows + 2
+    for payload in ([], {"shows": "2031-05-01"}):
+        response = client.post("/api/v1/shows/batch", json=payload)
+        assert response.status_code == 400
+    response = client.post("/api/v1/shows/batch", json={"shows": ["a row"]})
+    assert response.status_code == 422
+    assert response.get_json()["errors"] == [
+        {"row": 1, "error": "Expected the fields of one show."}
+    ]
@@ -0,0 +1,31 @@
+import json
+
+from bulk import import_command
+from conftest import seed
+from models import db, Show
+
+
+def test_show_import_rejects_overlaps_and_unknown_entities(app, tmp_path):
+    venue = seed(1)[0]
+    artist_id = venue.shows[0].artist_id
+    taken = venue.shows[0].start_time
+    source = tmp_path / "shows.csv"
+    source.write_text(
+        "venue_id,artist_id,start_time,duration\n"
+        f"{venue.id},{artist_id},2031-05-01 20:00:00,120\n"
+        f"{venue.id},{artist_id},2031-05-01 21:00:00,60\n"
+        f"{venue.id},{artist_id},{taken:%Y-%m-%d %H:%M:%S},60\n"
+        f"999999,{artist_id},2031-06-01 20:00:00,60\n"
+    )
+    rejects = tmp_path / "rejects.jsonl"
+    shows = db.session.query(Show).count()
+    result = app.test_cli_runner().invoke(
+        import_command, ["shows", str(source), "--rejects", str(rejects)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "1 imported, 3 rejected" in result.output
+    assert db.session.query(Show).count() == shows + 1
+    errors = [json.loads(line)["errors"]["show"][0] for line in rejects.open()]
+    assert "slot is taken by row 1" in errors[0]
+    assert "slot is taken by" in errors[1]
+    assert errors[2] == "Venue 999999 does not exist."
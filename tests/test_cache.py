@@ -0,0 +1,54 @@
+import re
+from datetime import datetime, timedelta
+
+from conftest import later
+from models import db, Venue, Artist, Show
+
+
+def add_show(hours):
+    """A venue and an artist with one show starting hours from now."""
+    venue = Venue(name="Venue", city="Austin", state="TX", address="1 Main St")
+    artist = Artist(name="Artist", city="Austin", state="TX")
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    start_time = datetime.now() + timedelta(hours=hours)
+    db.session.add(
+        Show(
+            venue_id=venue.id,
+            artist_id=artist.id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+    )
+    db.session.commit()
+    return venue, artist
+
+
+def test_cached_details_split_shows_at_request_time(client, cached, monkeypatch):
+    venue, artist = add_show(hours=1)
+    for path in (f"/api/v1/venues/{venue.id}", f"/api/v1/artists/{artist.id}"):
+        data = client.get(path).get_json()
+        assert (data["upcoming_shows_count"], data["past_shows_count"]) == (1, 0)
+    monkeypatch.setattr("api.datetime", later(hours=2))
+    for path in (f"/api/v1/venues/{venue.id}", f"/api/v1/artists/{artist.id}"):
+        data = client.get(path).get_json()
+        assert (data["upcoming_shows_count"], data["past_shows_count"]) == (0, 1)
+        assert "shows" not in data
+
+
+def sections(client, path):
+    """The show counts of a detail page and its upcoming and past sections."""
+    html = client.get(path).get_data(as_text=True)
+    counts = [int(count) for count in re.findall(r"(\d+) (?:Upcoming|Past) Show", html)]
+    upcoming, past = html.split(" Past Show")
+    return counts, upcoming, past
+
+
+def test_show_sections_follow_a_show_past_its_start(client, cached, monkeypatch):
+    venue, artist = add_show(hours=1)
+    path, link = f"/venues/{venue.id}", f"/artists/{artist.id}"
+    counts, upcoming, past = sections(client, path)
+    assert counts == [1, 0] and link in upcoming and link not in past
+    monkeypatch.setattr("app.datetime", later(hours=2))
+    counts, upcoming, past = sections(client, path)
+    assert counts == [0, 1] and link not in upcoming and link in past
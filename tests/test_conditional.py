@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from conftest import later, seed
+from models import db, Venue, Show, Genre
+
+
+def revalidate(client, statements, path, etag):
+    statements.clear()
+    response = client.get(path, headers={"If-None-Match": etag})
+    return response, len(statements)
+
+
+def test_unchanged_pages_answer_304_with_one_query(client, statements):
+    venue = seed(3)[0]
+    for path in (f"/venues/{venue.id}", f"/artists/{venue.shows[0].artist_id}"):
+        first = client.get(path)
+        assert first.status_code == 200
+        response, queries = revalidate(client, statements, path, first.headers["ETag"])
+        assert response.status_code == 304
+        assert response.data == b""
+        assert queries <= 1
+    for path in ("/venues", "/artists", "/shows"):
+        first = client.get(path)
+        response, queries = revalidate(client, statements, path, first.headers["ETag"])
+        assert response.status_code == 304
+        assert queries <= 1
+
+
+def test_genre_only_edit_changes_the_etag(client, statements):
+    venue = seed(1)[0]
+    path = f"/venues/{venue.id}"
+    etag = client.get(path).headers["ETag"]
+    venue = db.session.get(Venue, venue.id)
+    venue.genres = Genre.from_names(["Folk"])
+    db.session.commit()
+    response, _ = revalidate(client, statements, path, etag)
+    assert response.status_code == 200
+    assert b"Folk" in response.data
+
+
+def test_if_modified_since_sees_a_show_start(client, monkeypatch):
+    venue = seed(1)[0]
+    start_time = datetime.now() + timedelta(hours=1)
+    db.session.add(
+        Show(
+            venue_id=venue.id,
+            artist_id=venue.shows[0].artist_id,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+    )
+    db.session.commit()
+    path = f"/venues/{venue.id}"
+    last_modified = client.get(path).headers["Last-Modified"]
+    response = client.get(path, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    monkeypatch.setattr("app.datetime", later(hours=2))
+    response = client.get(path, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] != last_modified
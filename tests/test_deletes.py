@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from conftest import seed
+from deletes import delete_entities
+from models import db, Artist, Show
+
+
+def test_bulk_delete_removes_shows_and_refreshes_caches_and_counters(client, cached):
+    venues = seed(3, artists=1)
+    gone, kept = venues[0].id, venues[1].id
+    artist_id = venues[0].shows[0].artist_id
+    # Fill the caches the delete has to invalidate.
+    for path in (f"/venues/{gone}", f"/artists/{artist_id}", "/venues"):
+        assert "Venue 0" in client.get(path).get_data(as_text=True)
+
+    response = client.post("/api/v1/venues/delete", json={"ids": [gone, 999999]})
+    assert response.get_json() == {"deleted": [gone], "missing": [999999]}
+
+    assert db.session.query(Show).filter(Show.venue_id == gone).count() == 0
+    assert db.session.query(Show).filter(Show.venue_id == kept).count() == 2
+    artist = db.session.get(Artist, artist_id)
+    now = datetime.now()
+    shows = db.session.query(Show).filter(Show.artist_id == artist_id)
+    assert artist.upcoming_shows_count == shows.filter(Show.start_time >= now).count()
+    assert artist.past_shows_count == shows.filter(Show.start_time < now).count()
+    assert client.get(f"/venues/{gone}").status_code == 404
+    for path in (f"/artists/{artist_id}", "/venues"):
+        assert "Venue 0" not in client.get(path).get_data(as_text=True)
+
+
+def test_failed_bulk_delete_rolls_back(client, monkeypatch):
+    venue_id = seed(1)[0].id
+
+    def failing(model, ids):
+        delete_entities(model, ids)
+        raise OperationalError("DELETE", {}, Exception("disk I/O error"))
+
+    monkeypatch.setattr("api.delete_entities", failing)
+    with pytest.raises(OperationalError):
+        client.post("/api/v1/venues/delete", json={"ids": [venue_id]})
+    assert db.session.query(Show).filter(Show.venue_id == venue_id).count() == 2
@@ -0,0 +1,64 @@
+from geo import KM_PER_DEGREE, nearby
+from models import db, Venue
+
+
+def place(*coordinates):
+    venues = [
+        Venue(
+            name=f"Venue {index}",
+            city="City",
+            state="TX",
+            address=f"{index} Main St",
+            latitude=lat,
+            longitude=lon,
+        )
+        for index, (lat, lon) in enumerate(coordinates)
+    ]
+    db.session.add_all(venues)
+    db.session.commit()
+    return [venue.id for venue in venues]
+
+
+def found(lat, lon, radius_km, limit=10):
+    return [venue["id"] for venue in nearby(lat, lon, radius_km, limit)]
+
+
+def test_nearby_keeps_the_circle_not_the_box(app):
+    degree = 1 / KM_PER_DEGREE
+    inside, outside, corner, near = place(
+        (99.9 * degree, 0),
+        (100.1 * degree, 0),
+        # In the bounding box, but about 141 km away.
+        (99.9 * degree, 99.9 * degree),
+        (0, -10 * degree),
+    )
+    assert found(0, 0, 100) == [near, inside]
+    assert found(0, 0, 100, limit=1) == [near]
+    assert nearby(0, 0, 100, 1)[0]["distance_km"] == 10
+
+
+def test_nearby_across_the_antimeridian(app):
+    east, west, far = place((0, 179.9), (0, -179.9), (0, 170))
+    assert found(0, 179.95, 50) == [east, west]
+    assert found(0, -179.95, 50) == [west, east]
+
+
+def test_nearby_near_the_poles(app):
+    # A tenth of a degree from the pole, on opposite meridians.
+    here, across, south = place((89.9, 0), (89.9, 180), (80, 0))
+    assert found(89.9, 0, 50) == [here, across]
+    assert found(-89.9, 0, 50) == []
+
+
+def test_moving_a_venue_forgets_its_coordinates(app):
+    moved, renamed, geocoded = (
+        db.session.get(Venue, venue_id) for venue_id in place(*[(30, -97)] * 3)
+    )
+    moved.address = "2 Main St"
+    renamed.name = "Renamed"
+    geocoded.city, geocoded.latitude, geocoded.longitude = "Elsewhere", 31, -98
+    db.session.commit()
+    assert (moved.latitude, moved.longitude) == (None, None)
+    assert (renamed.latitude, renamed.longitude) == (30, -97)
+    assert (geocoded.latitude, geocoded.longitude) == (31, -98)
+    assert found(30, -97, 1) == [renamed.id]
@@ -0,0 +1,20 @@
+from ical import escape, fold
+
+
+def test_escape():
+    assert escape("a\\b;c,d") == r"a\\b\;c\,d"
+    assert escape("one\r\ntwo\rthree\nfour") == "one\\ntwo\\nthree\\nfour"
+
+
+def test_fold_keeps_lines_within_75_octets():
+    assert fold("x" * 75) == "x" * 75 + "\r\n"
+    lines = fold("SUMMARY:" + "é" * 100).split("\r\n")
+    assert lines[-1] == ""
+    lines = lines[:-1]
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert all(line.startswith(" ") for line in lines[1:])
+    # Each part decoded on its own: no two-byte character was split.
+    assert lines[0] + "".join(line[1:] for line in lines[1:]) == (
+        "SUMMARY:" + "é" * 100
+    )
+    assert len(lines[0].encode()) == 74
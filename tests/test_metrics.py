@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SERIES = (
+    "fyyur_request_duration_seconds_count",
+    "fyyur_request_db_seconds_count",
+    "fyyur_template_render_seconds_count",
+    "fyyur_cache_lookups_total",
+)
+
+
+def scrape():
+    """Requests a few pages, then prints what GET /metrics returns."""
+    from conftest import seed  # First: it sets up the environment.
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        venue = seed(2)[0]
+        client = app.test_client()
+        for path in ("/", "/venues", f"/venues/{venue.id}", f"/venues/{venue.id}"):
+            assert client.get(path).status_code == 200
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        print(response.get_data(as_text=True))
+
+
+@pytest.mark.parametrize("multiprocess", [False, True])
+def test_metrics_scrape(tmp_path, multiprocess):
+    # prometheus_client picks its storage when imported, so each mode gets a
+    # fresh interpreter.
+    env = dict(os.environ, CACHE_TYPE="simple")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if multiprocess:
+        env["PROMETHEUS_MULTIPROC_DIR"] = str(tmp_path)
+    exposition = subprocess.run(
+        [sys.executable, __file__],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    samples = {}
+    for line in exposition.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    for name in SERIES:
+        assert any(series.startswith(name) for series in samples), name
+    assert samples[
+        'fyyur_request_duration_seconds_count{endpoint="main.show_venue",'
+        'method="GET",status="200"}'
+    ] == pytest.approx(2)
+    assert samples['fyyur_cache_lookups_total{namespace="venue",result="hit"}'] >= 1
+    if multiprocess:
+        assert os.listdir(tmp_path)
+
+
+if __name__ == "__main__":
+    scrape()
+
+
+def test_metrics_token(app, client):
+    app.config["METRICS_TOKEN"] = "s3cret"
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.get("/metrics", headers=wrong).status_code == 401
+    right = {"Authorization": "Bearer s3cret"}
+    assert client.get("/metrics", headers=right).status_code == 200
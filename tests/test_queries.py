@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import seed
+from counters import refresh
+from models import db, Venue
+from queries import (
+    parse_window,
+    partition_shows,
+    shows_page,
+    venue_areas,
+    venue_detail,
+    venue_version,
+)
+
+
+def listing_queries(client, statements):
+    statements.clear()
+    response = client.get("/venues")
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_venue_listing_query_count_does_not_grow_with_rows(client, statements):
+    seed(10)
+    small = listing_queries(client, statements)
+    seed(100)
+    large = listing_queries(client, statements)
+    assert small == large == 2
+
+
+def test_venue_areas_group_spellings_under_the_first_one(app):
+    db.session.add_all(
+        Venue(name=name, city=city, state="TX", address="1 Main St")
+        for name, city in (("A", "McAllen"), ("B", "mcallen "), ("C", "MCALLEN"))
+    )
+    db.session.commit()
+    (area,) = venue_areas()
+    assert (area["city"], area["state"]) == ("McAllen", "TX")
+    assert [venue["name"] for venue in area["venues"]] == ["A", "B", "C"]
+
+
+def test_a_show_starting_now_is_upcoming_everywhere(app):
+    venue = seed(1, shows_per_venue=1)[0]
+    show = venue.shows[0]
+    now = show.start_time
+    refresh(Venue, [venue.id], now)
+    db.session.commit()
+    assert venue_version(venue.id, now)[-1] == venue.upcoming_shows_count == 1
+    data = partition_shows(venue_detail(venue.id), now)
+    assert data["upcoming_shows_count"] == 1
+
+
+def test_shows_page_matches_cities_like_venue_areas(app):
+    venues = seed(3, cities=1)
+    venues[0].city, venues[1].city = "New  York ", "new york"
+    db.session.commit()
+    page, _ = shows_page(10, city=" NEW YORK")
+    assert {show["venue_id"] for show in page} == {venues[0].id, venues[1].id}
+
+
+def test_parse_window():
+    assert parse_window("2031-05-01", "2031-05-01") == (
+        datetime(2031, 5, 1),
+        datetime(2031, 5, 2),
+    )
+    assert parse_window("", "2031-05-01T20:00") == (None, datetime(2031, 5, 1, 20))
+    assert parse_window(None, None) == (None, None)
+    for start, end in (
+        ("2031-05-01T20:00+02:00", None),
+        ("2031-05-02", "2031-05-01"),
+        ("2031-05-01T20:00", "2031-05-01T20:00"),
+        ("tomorrow", None),
+    ):
+        with pytest.raises(ValueError):
+            parse_window(start, end)
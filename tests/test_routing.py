@@ -0,0 +1,70 @@
+import shutil
+
+import pytest
+
+import config
+from app import create_app
+from cache import LRUCache, cache
+from conftest import DATABASE, seed
+from models import db, Artist
+from routing import STICKY_COOKIE
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """An app reading from a SQLite file that lags its primary.
+
+    Requests run outside the app context of the setup, so that they do not
+    share its g and session.
+    """
+    path = tmp_path / "replica.db"
+    monkeypatch.setattr(config, "SQLALCHEMY_REPLICA_URIS", [f"sqlite:///{path}"])
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        venue = seed(1)[0]
+        # Replicated up to here.
+        shutil.copy(DATABASE, path)
+        venue.name = "Renamed on the primary"
+        db.session.commit()
+        venue_id = venue.id
+        db.session.remove()
+    yield app, venue_id
+    with app.app_context():
+        db.drop_all()
+
+
+def test_read_only_views_read_the_replica(replica):
+    app, venue_id = replica
+    page = app.test_client().get("/venues").get_data(as_text=True)
+    assert "Venue 0" in page
+    assert "Renamed on the primary" not in page
+
+
+def test_cache_fills_read_the_primary(replica, monkeypatch):
+    app, venue_id = replica
+    monkeypatch.setattr(cache, "backend", LRUCache(1024, 3600))
+    page = app.test_client().get(f"/venues/{venue_id}").get_data(as_text=True)
+    assert "Renamed on the primary" in page
+
+
+def test_writes_go_to_the_primary_and_stick(replica):
+    app, venue_id = replica
+    client = app.test_client()
+    response = client.post(
+        "/artists/create",
+        data={
+            "name": "Written",
+            "city": "Austin",
+            "state": "TX",
+            "genres": "Jazz",
+            "facebook_link": "https://facebook.com/written",
+        },
+    )
+    assert STICKY_COOKIE in response.headers["Set-Cookie"]
+    with app.app_context():
+        assert Artist.query.filter_by(name="Written").count() == 1
+    # The writer reads its own write, everyone else the replica.
+    assert "Written" in client.get("/artists").get_data(as_text=True)
+    assert "Written" not in app.test_client().get("/artists").get_data(as_text=True)
@@ -0,0 +1,28 @@
+from models import db, Venue
+
+
+def add_venues(*names):
+    db.session.add_all(
+        Venue(name=name, city="San Francisco", state="CA", address="1 Main St")
+        for name in names
+    )
+    db.session.commit()
+
+
+def test_search_is_case_insensitive_and_partial(client):
+    add_venues("The Musical Hop", "Park Square Live Music & Coffee", "Music", "Hall")
+    response = client.get("/api/v1/search/venues", query_string={"q": "MUSIC"})
+    results = response.get_json()
+    assert results["count"] == 3
+    # The exact match first, then the others by name.
+    assert [venue["name"] for venue in results["data"]] == [
+        "Music",
+        "Park Square Live Music & Coffee",
+        "The Musical Hop",
+    ]
+    page = client.post("/venues/search", data={"search_term": "hOp"})
+    assert "The Musical Hop" in page.get_data(as_text=True)
+    assert "Park Square" not in page.get_data(as_text=True)
+    # LIKE wildcards in the term are matched literally.
+    response = client.get("/api/v1/search/venues", query_string={"q": "%"})
+    assert response.get_json()["count"] == 0
@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db
+from statements import statement_timed
+
+
+def test_a_failed_statement_does_not_skew_the_next(app):
+    timed = []
+
+    def record(sender, statement, seconds):
+        timed.append((statement, seconds))
+
+    statement_timed.connect(record)
+    try:
+        with db.engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+    finally:
+        statement_timed.disconnect(record)
+    assert [statement for statement, _ in timed] == ["SELECT 1"]
+    assert 0 <= timed[0][1] < 1